@@ -0,0 +1,143 @@
+"""
+Achievement evaluation engine.
+
+Achievements are cached in-process, grouped by ``requirement_type`` and sorted
+by ``requirement_value``, so an answer submission only looks at thresholds the
+latest ``UserLevel`` change could have crossed. Every lookup compares the cache
+generation with the ``achievements`` version counter in the database, so an
+achievement created through any worker rebuilds the index of all workers.
+"""
+import threading
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import insert, literal, select
+from sqlalchemy.orm import Session
+from app.database import conflict_insert
+from app.models import Achievement, UserAchievement, UserLevel
+from app.versions import ACHIEVEMENTS_VERSION, get_version
+
+# requirement_type -> UserLevel attribute holding the value it is compared to
+REQUIREMENT_METRICS = {
+    "streak": "current_streak",
+    "total_correct": "total_correct",
+    "level": "level",
+    "total_points": "total_experience",
+}
+
+# (achievements version counter, requirement_type -> (sorted requirement
+# values, achievement ids in the same order)) the index was built from
+_index: Optional[Tuple[int, Dict[str, Tuple[List[int], List[int]]]]] = None
+_index_lock = threading.Lock()
+
+def invalidate_achievement_cache():
+    """Drop the cached achievement index; it is reloaded on next use"""
+    global _index
+    with _index_lock:
+        _index = None
+
+def _get_index(db: Session) -> Dict[str, Tuple[List[int], List[int]]]:
+    global _index
+    version = get_version(db, ACHIEVEMENTS_VERSION)
+    cached = _index
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    
+    with _index_lock:
+        if _index is None or _index[0] != version:
+            rows = db.query(
+                Achievement.id,
+                Achievement.requirement_type,
+                Achievement.requirement_value
+            ).order_by(Achievement.requirement_value, Achievement.id).all()
+            
+            grouped: Dict[str, Tuple[List[int], List[int]]] = {}
+            for achievement_id, requirement_type, requirement_value in rows:
+                values, ids = grouped.setdefault(requirement_type, ([], []))
+                values.append(requirement_value)
+                ids.append(achievement_id)
+            _index = (version, grouped)
+        return _index[1]
+
+def snapshot_metrics(user_level: UserLevel) -> Dict[str, int]:
+    """Capture the achievement-relevant values of a UserLevel before it changes"""
+    return {
+        requirement_type: getattr(user_level, attribute) or 0
+        for requirement_type, attribute in REQUIREMENT_METRICS.items()
+    }
+
+def check_achievements(
+    db: Session,
+    user_id: int,
+    user_level: UserLevel,
+    previous: Dict[str, int],
+    peaks: Optional[Dict[str, int]] = None
+) -> List[int]:
+    """Unlock achievements whose threshold was crossed since ``previous`` (no commit)
+
+    ``peaks`` overrides the current value of a metric with the highest value it
+    reached in between, e.g. a streak that was broken later in a batch.
+    """
+    index = _get_index(db)
+    current = snapshot_metrics(user_level)
+    if peaks:
+        current.update(peaks)
+    
+    # Thresholds in (old value, new value] are the only ones that may newly hold
+    candidates = []
+    for requirement_type, entry in index.items():
+        values, ids = entry
+        old_value = previous.get(requirement_type, 0)
+        new_value = current.get(requirement_type, 0)
+        if new_value <= old_value:
+            continue
+        start = bisect_right(values, old_value)
+        end = bisect_right(values, new_value)
+        candidates.extend(ids[start:end])
+    
+    if not candidates:
+        return []
+    
+    unlocked_ids = {
+        achievement_id for (achievement_id,) in db.query(UserAchievement.achievement_id).filter(
+            UserAchievement.user_id == user_id,
+            UserAchievement.achievement_id.in_(candidates)
+        )
+    }
+    
+    newly_unlocked = [achievement_id for achievement_id in candidates if achievement_id not in unlocked_ids]
+    if newly_unlocked:
+        _insert_unlocks(db, user_id, newly_unlocked)
+    return newly_unlocked
+
+def _insert_unlocks(db: Session, user_id: int, achievement_ids: List[int]):
+    """Insert unlocks, tolerating a concurrent request that unlocked the same achievement"""
+    rows = [{"user_id": user_id, "achievement_id": achievement_id} for achievement_id in achievement_ids]
+    statement = conflict_insert(db, UserAchievement)
+    if statement is None:
+        db.add_all(UserAchievement(**row) for row in rows)
+        return
+    db.execute(statement.values(rows).on_conflict_do_nothing(
+        index_elements=["user_id", "achievement_id"]
+    ))
+
+def award_existing_qualifiers(db: Session, achievement: Achievement):
+    """Grant a newly created achievement to students who already meet it (no commit)
+
+    Submissions only evaluate thresholds they cross, so students who are
+    already past the requirement would otherwise never receive it.
+    """
+    attribute = REQUIREMENT_METRICS.get(achievement.requirement_type)
+    if attribute is None:
+        return
+    
+    qualifiers = select(
+        UserLevel.user_id,
+        literal(achievement.id)
+    ).where(
+        getattr(UserLevel, attribute) >= achievement.requirement_value,
+        ~select(UserAchievement.id).where(
+            UserAchievement.user_id == UserLevel.user_id,
+            UserAchievement.achievement_id == achievement.id
+        ).exists()
+    )
+    db.execute(insert(UserAchievement).from_select(["user_id", "achievement_id"], qualifiers))
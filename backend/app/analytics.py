@@ -0,0 +1,151 @@
+"""
+Item analysis of quiz questions.
+
+For every question this computes the number of attempts, the difficulty
+(p-value: the fraction of students whose first attempt was correct) and the
+point-biserial discrimination: the correlation between a student's first
+attempt at the question and their accuracy on the other questions of the same
+subject. All sums are aggregated in SQL, so a subject report is a single query
+regardless of the number of submissions. Archived submissions are not included.
+"""
+import json
+import math
+from typing import Any, Dict, List, Optional
+from sqlalchemy import Float, String, and_, case, cast, func, select
+from sqlalchemy.orm import Session
+from app.models import Question, QuizSubmission
+
+# Thresholds used to flag questions for review
+MIN_STUDENTS = 10
+TOO_EASY = 0.9
+TOO_HARD = 0.2
+LOW_DISCRIMINATION = 0.1
+WRONG_ANSWER_LIMIT = 5
+
+def _item_statistics(db: Session, subject_id: int, question_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    is_correct = case((QuizSubmission.is_correct == True, 1), else_=0)
+    subject_submissions = select(
+        QuizSubmission.id,
+        QuizSubmission.student_id,
+        QuizSubmission.question_id,
+        is_correct.label("correct")
+    ).join(
+        Question, Question.id == QuizSubmission.question_id
+    ).where(Question.subject_id == subject_id).subquery()
+
+    # One row per (student, question): attempts, correct attempts, first attempt
+    per_item = select(
+        subject_submissions.c.student_id,
+        subject_submissions.c.question_id,
+        func.count().label("attempts"),
+        func.sum(subject_submissions.c.correct).label("correct"),
+        func.min(subject_submissions.c.id).label("first_id")
+    ).group_by(subject_submissions.c.student_id, subject_submissions.c.question_id)
+    if question_id is not None:
+        per_item = per_item.where(subject_submissions.c.question_id == question_id)
+    per_item = per_item.subquery()
+
+    # One row per student: totals over the whole subject
+    per_student = select(
+        subject_submissions.c.student_id,
+        func.count().label("attempts"),
+        func.sum(subject_submissions.c.correct).label("correct")
+    ).group_by(subject_submissions.c.student_id).subquery()
+
+    first_attempt = QuizSubmission.__table__.alias("first_attempt")
+    x = case((first_attempt.c.is_correct == True, 1.0), else_=0.0)
+    rest_attempts = per_student.c.attempts - per_item.c.attempts
+    # Accuracy on the rest of the subject; undefined without other attempts
+    y = case(
+        (rest_attempts > 0, cast(per_student.c.correct - per_item.c.correct, Float) / rest_attempts),
+        else_=None
+    )
+    has_rest = rest_attempts > 0
+
+    query = select(
+        per_item.c.question_id,
+        func.sum(per_item.c.attempts).label("attempts"),
+        func.sum(per_item.c.correct).label("correct_attempts"),
+        func.count().label("students"),
+        func.sum(x).label("first_correct"),
+        func.sum(case((has_rest, 1), else_=0)).label("n"),
+        func.sum(case((has_rest, x), else_=0.0)).label("sum_x"),
+        func.sum(y).label("sum_y"),
+        func.sum(x * y).label("sum_xy"),
+        func.sum(case((has_rest, x * x), else_=0.0)).label("sum_xx"),
+        func.sum(y * y).label("sum_yy")
+    ).select_from(per_item).join(
+        first_attempt, first_attempt.c.id == per_item.c.first_id
+    ).join(
+        per_student, per_student.c.student_id == per_item.c.student_id
+    ).group_by(per_item.c.question_id)
+
+    return [row._asdict() for row in db.execute(query)]
+
+def _point_biserial(row: Dict[str, Any]) -> Optional[float]:
+    n = row["n"] or 0
+    if n < 2:
+        return None
+    sum_x, sum_y = row["sum_x"] or 0.0, row["sum_y"] or 0.0
+    covariance = n * (row["sum_xy"] or 0.0) - sum_x * sum_y
+    variance_x = n * (row["sum_xx"] or 0.0) - sum_x * sum_x
+    variance_y = n * (row["sum_yy"] or 0.0) - sum_y * sum_y
+    if variance_x <= 0 or variance_y <= 0:
+        return None
+    return round(covariance / math.sqrt(variance_x * variance_y), 4)
+
+def _flags(students: int, p_value: Optional[float], point_biserial: Optional[float]) -> List[str]:
+    if students < MIN_STUDENTS:
+        return []
+    flags = []
+    if p_value is not None and p_value >= TOO_EASY:
+        flags.append("too_easy")
+    if p_value is not None and p_value <= TOO_HARD:
+        flags.append("too_hard")
+    if point_biserial is not None and point_biserial < 0:
+        flags.append("negative_discrimination")
+    elif point_biserial is not None and point_biserial < LOW_DISCRIMINATION:
+        flags.append("low_discrimination")
+    return flags
+
+def _stats(question: Question, row: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    row = row or {}
+    students = row.get("students") or 0
+    p_value = round(row["first_correct"] / students, 4) if students else None
+    point_biserial = _point_biserial(row) if row else None
+    return {
+        "question_id": question.id,
+        "subject_id": question.subject_id,
+        "question_type": question.question_type,
+        "question_text": question.question_text,
+        "attempts": row.get("attempts") or 0,
+        "correct_attempts": row.get("correct_attempts") or 0,
+        "students": students,
+        "p_value": p_value,
+        "point_biserial": point_biserial,
+        "flags": _flags(students, p_value, point_biserial),
+    }
+
+def common_wrong_answers(db: Session, question_id: int, limit: int = WRONG_ANSWER_LIMIT) -> List[Dict[str, Any]]:
+    answer_text = cast(QuizSubmission.answer, String)
+    rows = db.execute(
+        select(answer_text, func.count().label("count"))
+        .where(and_(QuizSubmission.question_id == question_id, QuizSubmission.is_correct == False))
+        .group_by(answer_text)
+        .order_by(func.count().desc())
+        .limit(limit)
+    )
+    return [{"answer": json.loads(answer), "count": count} for answer, count in rows]
+
+def question_stats(db: Session, question: Question) -> Dict[str, Any]:
+    """Item statistics of one question, including its most common wrong answers"""
+    rows = _item_statistics(db, question.subject_id, question.id)
+    stats = _stats(question, rows[0] if rows else None)
+    stats["common_wrong_answers"] = common_wrong_answers(db, question.id)
+    return stats
+
+def subject_report(db: Session, subject_id: int) -> List[Dict[str, Any]]:
+    """Item statistics of every question in a subject, in question order"""
+    rows = {row["question_id"]: row for row in _item_statistics(db, subject_id)}
+    questions = db.query(Question).filter(Question.subject_id == subject_id).order_by(Question.id)
+    return [_stats(question, rows.get(question.id)) for question in questions]
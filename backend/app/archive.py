@@ -0,0 +1,124 @@
+"""
+Archival of old quiz submissions.
+
+Raw ``quiz_submissions`` rows older than a cutoff are appended to a gzip
+compressed JSON Lines file and replaced by one ``submission_summaries`` row per
+student and question (attempt count, best result, last answer). Per-subject
+stats are untouched, so progress and score numbers stay the same.
+"""
+import gzip
+import json
+import os
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+from app.models import QuizSubmission, SubmissionSummary
+
+ARCHIVE_CHUNK_SIZE = 5000
+
+def _serialize(submission: QuizSubmission) -> str:
+    return json.dumps({
+        "id": submission.id,
+        "student_id": submission.student_id,
+        "question_id": submission.question_id,
+        "answer": submission.answer,
+        "is_correct": submission.is_correct,
+        "points_earned": submission.points_earned,
+        "submitted_at": submission.submitted_at.isoformat() if submission.submitted_at else None,
+    }, ensure_ascii=False)
+
+def _merge_into_summary(summary: SubmissionSummary, submission: QuizSubmission):
+    points = submission.points_earned or 0
+    summary.attempts += 1
+    summary.correct_attempts += 1 if submission.is_correct else 0
+    summary.points_earned += points
+    summary.best_points = max(summary.best_points, points)
+    summary.ever_correct = summary.ever_correct or submission.is_correct
+    if summary.first_submitted_at is None or (
+        submission.submitted_at is not None and submission.submitted_at < summary.first_submitted_at
+    ):
+        summary.first_submitted_at = submission.submitted_at
+    # Rows are archived oldest first, so a row is never older than what the
+    # summary already holds; compare timestamps since old databases may reuse ids
+    if summary.last_submitted_at is None or (
+        submission.submitted_at is not None and submission.submitted_at >= summary.last_submitted_at
+    ):
+        summary.last_submission_id = submission.id
+        summary.last_answer = submission.answer
+        summary.last_is_correct = submission.is_correct
+        summary.last_points_earned = points
+        summary.last_submitted_at = submission.submitted_at
+
+def _summaries_for(db: Session, keys) -> Dict[Tuple[int, int], SubmissionSummary]:
+    """Existing summary rows for a set of (student_id, question_id) pairs"""
+    if not keys:
+        return {}
+    rows = db.query(SubmissionSummary).filter(
+        SubmissionSummary.student_id.in_({student_id for student_id, _ in keys}),
+        SubmissionSummary.question_id.in_({question_id for _, question_id in keys})
+    )
+    return {
+        (row.student_id, row.question_id): row
+        for row in rows
+        if (row.student_id, row.question_id) in keys
+    }
+
+def archive_submissions(db: Session, cutoff: datetime, archive_dir: str, chunk_size: int = ARCHIVE_CHUNK_SIZE) -> Tuple[int, Optional[str]]:
+    """Move submissions older than ``cutoff`` into the archive; returns (rows archived, file path)
+
+    Work is done in chunks, each committed on its own, so memory stays flat.
+    Rows are written to the archive file before their chunk is deleted.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"submissions-{datetime.utcnow():%Y%m%d%H%M%S}.jsonl.gz")
+    archived = 0
+    last_id = 0
+    
+    with gzip.open(path, "at", encoding="utf-8") as archive_file:
+        while True:
+            chunk = db.query(QuizSubmission).filter(
+                QuizSubmission.submitted_at < cutoff,
+                QuizSubmission.id > last_id
+            ).order_by(QuizSubmission.id).limit(chunk_size).all()
+            if not chunk:
+                break
+            
+            for submission in chunk:
+                archive_file.write(_serialize(submission) + "\n")
+            archive_file.flush()
+            
+            keys = {(s.student_id, s.question_id) for s in chunk}
+            summaries = _summaries_for(db, keys)
+            for submission in chunk:
+                key = (submission.student_id, submission.question_id)
+                summary = summaries.get(key)
+                if summary is None:
+                    summary = SubmissionSummary(
+                        student_id=submission.student_id,
+                        question_id=submission.question_id,
+                        attempts=0,
+                        correct_attempts=0,
+                        points_earned=0,
+                        best_points=0,
+                        ever_correct=False,
+                        last_submission_id=0,
+                        last_answer=submission.answer,
+                        last_is_correct=submission.is_correct
+                    )
+                    db.add(summary)
+                    summaries[key] = summary
+                _merge_into_summary(summary, submission)
+            
+            last_id = chunk[-1].id
+            db.execute(delete(QuizSubmission).where(
+                QuizSubmission.id.in_([s.id for s in chunk])
+            ))
+            db.commit()
+            db.expunge_all()
+            archived += len(chunk)
+    
+    if archived == 0:
+        os.remove(path)
+        return 0, None
+    return archived, path
@@ -1,20 +1,65 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.config import settings
+from app.database import SessionLocal, get_async_db, get_db
 from app.models import User
+from app.ttl_cache import TTLCache
 
 # Secret key for JWT (in production, use environment variable)
 SECRET_KEY = "your-secret-key-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# bcrypt cost factor for new hashes; stored hashes with another cost are
+# upgraded transparently on the next successful login
+BCRYPT_ROUNDS = settings.bcrypt_rounds
+PASSWORD_HASH_WORKERS = settings.password_hash_pool_size
+PASSWORD_HASH_MAX_QUEUE = settings.password_hash_max_queue
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+@dataclass(frozen=True)
+class Principal:
+    """Detached snapshot of the authenticated user, safe to cache across requests"""
+    id: int
+    username: str
+    email: str
+    full_name: str
+    is_admin: bool
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            full_name=user.full_name,
+            is_admin=bool(user.is_admin),
+            created_at=user.created_at
+        )
+
+# Authenticated principals keyed by token subject (username). No endpoint
+# changes an existing user's profile or role, so entries are never invalidated
+# explicitly; the TTL bounds how long a change made directly in the database
+# can go unnoticed.
+principal_cache: TTLCache[Principal] = TTLCache(
+    max_size=settings.principal_cache_size,
+    ttl_seconds=settings.principal_cache_ttl_seconds
+)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash using bcrypt directly"""
     try:
@@ -34,11 +79,75 @@ def get_password_hash(password: str) -> str:
     if isinstance(password, str):
         password = password.encode('utf-8')
     # Generate salt and hash
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password, salt)
     # Return as string
     return hashed.decode('utf-8')
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True if a stored bcrypt hash was made with a different cost factor"""
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated, bounded thread pool
+
+    Keeps login storms from occupying the event loop and the request
+    threadpool: handlers await the pool without holding a thread or a
+    database connection. When more than ``max_queue`` operations are
+    pending, new requests are rejected with 503 instead of piling up.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pending = 0
+        self.max_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queue_depth": self.pending,
+            "max_queue_depth": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+        }
+
+    async def run(self, func, *args):
+        with self._lock:
+            if self.pending >= self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Server sedang sibuk, silakan coba lagi",
+                    headers={"Retry-After": "1"},
+                )
+            self.pending += 1
+            self.max_pending = max(self.max_pending, self.pending)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.run(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -49,37 +158,97 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = db.query(User).filter(User.username == username).first()
+def _find_user(username: str) -> Optional[User]:
+    """Load a user detached from its session, so no connection is held while hashing"""
+    with SessionLocal() as db:
+        return db.query(User).filter(User.username == username).first()
+
+def _store_password_hash(user_id: int, hashed_password: str):
+    with SessionLocal() as db:
+        db.query(User).filter(User.id == user_id).update({"hashed_password": hashed_password})
+        db.commit()
+
+async def authenticate_user(username: str, password: str):
+    """Check credentials; database work runs on the threadpool, bcrypt on the hashing pool"""
+    user = await run_in_threadpool(_find_user, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return False
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash_async(password)
+        await run_in_threadpool(_store_password_hash, user.id, user.hashed_password)
     return user
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Tidak dapat memverifikasi kredensial",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_token_subject(token: str) -> str:
+    """Verify a JWT and return its subject (username)"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
+            raise _credentials_exception()
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    return username
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    # Sync so that a cache miss queries the database on the threadpool
+    username = decode_token_subject(token)
+    
+    principal = principal_cache.get(username)
+    if principal is not None:
+        return principal
+    
     user = db.query(User).filter(User.username == username).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    principal = Principal.from_user(user)
+    principal_cache.set(username, principal)
+    return principal
+
+async def authenticate_user_async(db: AsyncSession, username: str, password: str):
+    """``authenticate_user`` for the async database session"""
+    user = (await db.execute(select(User).where(User.username == username))).scalar_one_or_none()
+    if not user:
+        return False
+    if not await verify_password_async(password, user.hashed_password):
+        return False
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash_async(password)
+        await db.commit()
+        await db.refresh(user)
     return user
 
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """``get_current_user`` for endpoints running on the async database session"""
+    username = decode_token_subject(token)
+    
+    principal = principal_cache.get(username)
+    if principal is not None:
+        return principal
+    
+    user = (await db.execute(select(User).where(User.username == username))).scalar_one_or_none()
+    if user is None:
+        raise _credentials_exception()
+    principal = Principal.from_user(user)
+    principal_cache.set(username, principal)
+    return principal
+
 async def get_current_admin_user(
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     if not current_user.is_admin:
         raise HTTPException(
@@ -1,19 +1,94 @@
-from sqlalchemy import create_engine
+from typing import Any, Callable, Dict, List
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-import os
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.config import settings
 
-# SQLite database
-SQLALCHEMY_DATABASE_URL = "sqlite:///./quiz_platform.db"
+SQLALCHEMY_DATABASE_URL = settings.database_url
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+def _is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return (
+        parsed.get_backend_name() == "sqlite"
+        and (parsed.database in (None, "", ":memory:") or parsed.query.get("mode") == "memory")
+    )
+
+def _engine_options(url: str) -> dict:
+    options = {
+        "echo": settings.db_echo,
+        "pool_pre_ping": True,
+    }
+    if _is_memory_sqlite(url):
+        # Every connection to an in-memory database opens a new, empty one,
+        # so all sessions share a single connection
+        options["poolclass"] = StaticPool
+    else:
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+        )
+    if settings.is_sqlite:
+        options["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": settings.sqlite_busy_timeout_ms / 1000,
+        }
+    return options
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers proceed while a submission is being committed
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    cursor.close()
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL))
+if settings.is_sqlite:
+    event.listen(engine, "connect", _set_sqlite_pragmas)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+def conflict_insert(db, model):
+    """Dialect-specific INSERT supporting ON CONFLICT, or None if the backend lacks it"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    return insert(model)
+
+# Work queued on a session and run only if that session commits
+PENDING_COMMIT_KEY = "on_commit"
+_commit_handlers: Dict[str, Callable[[List[Any]], None]] = {}
+
+def register_commit_handler(key: str, handler: Callable[[List[Any]], None]):
+    """Call ``handler(items)`` with the items queued under ``key`` whenever a session commits"""
+    _commit_handlers[key] = handler
+
+def on_commit(db: Session, key: str, item: Any):
+    """Queue ``item`` for the ``key`` handler; dropped if the session rolls back instead"""
+    db.info.setdefault(PENDING_COMMIT_KEY, {}).setdefault(key, []).append(item)
+
+@event.listens_for(Session, "after_commit")
+def _run_commit_handlers(session: Session):
+    pending = session.info.pop(PENDING_COMMIT_KEY, None)
+    if pending:
+        for key, items in pending.items():
+            _commit_handlers[key](items)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_commit_items(session: Session):
+    session.info.pop(PENDING_COMMIT_KEY, None)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -21,3 +96,18 @@ def get_db():
     finally:
         db.close()
 
+# Optional async engine (USE_ASYNC_DB=true), used by the async hot-path endpoints
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.use_async_db:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    
+    async_engine = create_async_engine(settings.async_url, **_engine_options(settings.async_url))
+    if settings.is_sqlite:
+        event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
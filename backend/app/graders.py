@@ -0,0 +1,94 @@
+"""
+Answer graders per question type.
+
+Each question is compiled once into a grader holding its normalized expected
+answer; grading a submission is then a single call. New question types are
+added by registering a grader class with ``register_grader``.
+"""
+from typing import Any, Callable, Dict, Type
+
+GRADERS: Dict[str, Type["Grader"]] = {}
+
+def register_grader(question_type: str) -> Callable[[Type["Grader"]], Type["Grader"]]:
+    """Class decorator registering a grader for a question type"""
+    def decorator(grader_class: Type["Grader"]) -> Type["Grader"]:
+        GRADERS[question_type] = grader_class
+        return grader_class
+    return decorator
+
+def normalize_text(value: Any) -> str:
+    """Case-insensitive text with surrounding and repeated whitespace collapsed"""
+    return " ".join(str(value).split()).casefold()
+
+class Grader:
+    """Base grader; unknown question types never accept an answer"""
+    __slots__ = ()
+
+    def __init__(self, correct_answer: Dict[str, Any]):
+        pass
+
+    def __call__(self, user_answer: Dict[str, Any]) -> bool:
+        return False
+
+@register_grader("multiple_choice")
+class MultipleChoiceGrader(Grader):
+    __slots__ = ("expected",)
+
+    def __init__(self, correct_answer: Dict[str, Any]):
+        self.expected = correct_answer.get("selected")
+
+    def __call__(self, user_answer: Dict[str, Any]) -> bool:
+        return user_answer.get("selected") == self.expected
+
+@register_grader("drag_drop")
+class DragDropGrader(Grader):
+    __slots__ = ("expected",)
+
+    def __init__(self, correct_answer: Dict[str, Any]):
+        # Compare the order/positions as frozen tuples
+        self.expected = tuple(correct_answer.get("order", []))
+
+    def __call__(self, user_answer: Dict[str, Any]) -> bool:
+        user_order = user_answer.get("order", [])
+        if not isinstance(user_order, (list, tuple)):
+            return False
+        return tuple(user_order) == self.expected
+
+@register_grader("fill_blank")
+class FillBlankGrader(Grader):
+    __slots__ = ("expected",)
+
+    def __init__(self, correct_answer: Dict[str, Any]):
+        self.expected = {
+            blank: normalize_text(value)
+            for blank, value in (correct_answer.get("fills") or {}).items()
+        }
+
+    def __call__(self, user_answer: Dict[str, Any]) -> bool:
+        user_fills = user_answer.get("fills") or {}
+        if not isinstance(user_fills, dict) or user_fills.keys() != self.expected.keys():
+            return False
+        return all(
+            normalize_text(user_fills[blank]) == expected
+            for blank, expected in self.expected.items()
+        )
+
+@register_grader("true_false")
+class TrueFalseGrader(Grader):
+    __slots__ = ("expected",)
+
+    @staticmethod
+    def _to_bool(value: Any) -> Any:
+        if isinstance(value, str):
+            return {"true": True, "false": False}.get(normalize_text(value), value)
+        return value
+
+    def __init__(self, correct_answer: Dict[str, Any]):
+        self.expected = self._to_bool(correct_answer.get("answer"))
+
+    def __call__(self, user_answer: Dict[str, Any]) -> bool:
+        return self._to_bool(user_answer.get("answer")) == self.expected
+
+def compile_grader(question_type: str, correct_answer: Dict[str, Any]) -> Grader:
+    """Build the grader for a question; unknown types get a grader that rejects everything"""
+    return GRADERS.get(question_type, Grader)(correct_answer or {})
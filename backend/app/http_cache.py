@@ -0,0 +1,84 @@
+"""
+Conditional GET support for read-mostly endpoints.
+
+Responses derived from tables guarded by a version counter (see
+``app.versions``) carry an ETag built from those counters and a Last-Modified
+taken from their last bump. A request whose validators still match is answered
+with 304 before the endpoint loads anything through the ORM.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.models import CacheVersion
+
+# Responses depend on the caller's token: keep them out of shared caches and
+# make browsers revalidate before reuse
+CACHE_CONTROL = "private, no-cache"
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+def _not_modified_since(if_modified_since: str, last_modified: Optional[datetime]) -> bool:
+    if last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+def check_versions(db: Session, request: Request, *names: str) -> Dict[str, str]:
+    """Validator headers for the named counters; raises 304 if the client copy is current"""
+    rows = {
+        name: (version, updated_at)
+        for name, version, updated_at in db.execute(
+            select(CacheVersion.name, CacheVersion.version, CacheVersion.updated_at)
+            .where(CacheVersion.name.in_(names))
+        )
+    }
+    etag = '"' + "-".join(f"{name}.{rows.get(name, (0, None))[0]}" for name in names) + '"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    
+    timestamps = [updated_at for _, updated_at in rows.values() if updated_at is not None]
+    last_modified = max(timestamps).replace(tzinfo=timezone.utc) if timestamps else None
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        fresh = if_modified_since is not None and _not_modified_since(if_modified_since, last_modified)
+    if fresh:
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return headers
+
+class Versioned:
+    """Dependency adding cache validators for data guarded by version counters
+
+    Endpoints returning a model get the headers automatically; endpoints that
+    build their own ``Response`` must pass the returned headers on.
+    """
+
+    def __init__(self, *names: str):
+        self.names = names
+
+    def __call__(self, request: Request, response: Response, db: Session = Depends(get_db)) -> Dict[str, str]:
+        headers = check_versions(db, request, *self.names)
+        response.headers.update(headers)
+        return headers
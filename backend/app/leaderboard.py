@@ -0,0 +1,109 @@
+"""
+In-memory leaderboards.
+
+Scores are kept in sorted lists so a student's rank is a binary search,
+independent of how many students there are. The global board ranks
+``UserLevel.total_experience``; one board per subject ranks the points in
+``student_subject_stats``. Boards are rebuilt from the database at startup and
+updated when a session that recorded submissions commits.
+"""
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.database import on_commit, register_commit_handler
+from app.models import StudentSubjectStats, UserLevel
+
+PENDING_KEY = "leaderboard_updates"
+
+class RankIndex:
+    """Scores ordered highest first; ties share the same (competition) rank"""
+
+    def __init__(self):
+        self._keys: List[Tuple[int, int]] = []
+        self._scores: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def score(self, user_id: int) -> Optional[int]:
+        return self._scores.get(user_id)
+
+    def set(self, user_id: int, score: int):
+        old_score = self._scores.get(user_id)
+        if old_score == score:
+            return
+        if old_score is not None:
+            position = bisect_left(self._keys, (-old_score, user_id))
+            del self._keys[position]
+        insort(self._keys, (-score, user_id))
+        self._scores[user_id] = score
+
+    def add(self, user_id: int, delta: int):
+        self.set(user_id, self._scores.get(user_id, 0) + delta)
+
+    def rank(self, user_id: int) -> Optional[int]:
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return bisect_left(self._keys, (-score,)) + 1
+
+    def top(self, limit: int) -> List[Tuple[int, int, int]]:
+        """``(rank, user_id, score)`` for the best ``limit`` entries"""
+        result = []
+        for position, (negative_score, user_id) in enumerate(self._keys[:limit]):
+            if result and result[-1][2] == -negative_score:
+                rank = result[-1][0]
+            else:
+                rank = position + 1
+            result.append((rank, user_id, -negative_score))
+        return result
+
+class Leaderboard:
+    def __init__(self):
+        self.global_index = RankIndex()
+        self.subject_indexes: Dict[int, RankIndex] = {}
+        self._lock = threading.Lock()
+
+    def rebuild(self, db: Session):
+        global_index = RankIndex()
+        for user_id, total_experience in db.query(UserLevel.user_id, UserLevel.total_experience):
+            global_index.set(user_id, total_experience or 0)
+        
+        subject_indexes: Dict[int, RankIndex] = {}
+        for student_id, subject_id, points in db.query(
+            StudentSubjectStats.student_id,
+            StudentSubjectStats.subject_id,
+            StudentSubjectStats.points
+        ):
+            subject_indexes.setdefault(subject_id, RankIndex()).set(student_id, points or 0)
+        
+        with self._lock:
+            self.global_index = global_index
+            self.subject_indexes = subject_indexes
+
+    def apply(self, updates: List[tuple]):
+        with self._lock:
+            for kind, user_id, key, value in updates:
+                if kind == "experience":
+                    self.global_index.set(user_id, value)
+                else:
+                    self.subject_indexes.setdefault(key, RankIndex()).add(user_id, value)
+
+    def standings(self, subject_id: Optional[int], user_id: int, limit: int):
+        """Top ``limit`` entries plus the caller's rank and score"""
+        with self._lock:
+            index = self.global_index if subject_id is None else self.subject_indexes.get(subject_id, RankIndex())
+            return index.top(limit), index.rank(user_id), index.score(user_id), len(index)
+
+leaderboard = Leaderboard()
+
+def record_experience(db: Session, user_id: int, total_experience: int):
+    """Queue a global score change; applied once the session commits"""
+    on_commit(db, PENDING_KEY, ("experience", user_id, None, total_experience))
+
+def record_subject_points(db: Session, user_id: int, subject_id: int, delta: int):
+    """Queue a per-subject points increment; applied once the session commits"""
+    on_commit(db, PENDING_KEY, ("subject", user_id, subject_id, delta))
+
+register_commit_handler(PENDING_KEY, leaderboard.apply)
@@ -0,0 +1,136 @@
+"""
+Live score updates for the admin dashboard.
+
+Committed submissions publish per-student score deltas to an in-process feed
+that every connected dashboard socket subscribes to. A subscriber merges the
+deltas of the same student until its socket has sent the previous message and
+the flush interval has passed, so a burst of answers becomes one small message
+and a slow client only delays its own updates. A subscriber that falls more
+than ``max_pending`` students behind is told to reload the full scores
+instead of buffering without bound. Subscriptions are per worker process.
+"""
+import asyncio
+import threading
+from typing import Dict, List, Sequence, Set, Tuple
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import on_commit, register_commit_handler
+
+PENDING_KEY = "score_deltas"
+
+Deltas = Dict[int, List[int]]
+
+def _merge(pending: Deltas, deltas: Dict[int, Sequence[int]]):
+    for student_id, (attempts, correct, points) in deltas.items():
+        totals = pending.get(student_id)
+        if totals is None:
+            pending[student_id] = [attempts, correct, points]
+        else:
+            totals[0] += attempts
+            totals[1] += correct
+            totals[2] += points
+
+class Subscriber:
+    """Coalesced deltas waiting to be sent to one socket"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_pending: int):
+        self.loop = loop
+        self.max_pending = max_pending
+        self._pending: Deltas = {}
+        self._overflowed = False
+        self._ready = asyncio.Event()
+
+    def push(self, deltas: Deltas):
+        """Merge ``{student_id: [attempts, correct, points]}`` (runs on the subscriber's loop)"""
+        if not self._overflowed:
+            _merge(self._pending, deltas)
+            if len(self._pending) > self.max_pending:
+                self._overflowed = True
+                self._pending.clear()
+        self._ready.set()
+
+    async def next_message(self, flush_interval: float) -> dict:
+        """Wait for deltas, let a burst accumulate for ``flush_interval`` seconds, then drain"""
+        await self._ready.wait()
+        await asyncio.sleep(flush_interval)
+        self._ready.clear()
+        if self._overflowed:
+            self._overflowed = False
+            return {"type": "resync"}
+        pending, self._pending = self._pending, {}
+        return {
+            "type": "deltas",
+            "deltas": [
+                {"student_id": student_id, "attempts": attempts, "correct": correct, "points": points}
+                for student_id, (attempts, correct, points) in pending.items()
+            ],
+        }
+
+class ScoreFeed:
+    """Fans deltas out to the subscribers of every event loop
+
+    Publishing merges into one inbox per loop and only wakes the loop when
+    that inbox was empty, so a burst of commits costs one callback per loop
+    rather than one per commit and subscriber.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[asyncio.AbstractEventLoop, Set[Subscriber]] = {}
+        self._inboxes: Dict[asyncio.AbstractEventLoop, Deltas] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, max_pending: int = settings.live_scores_max_pending) -> Subscriber:
+        """Register a subscriber on the running event loop"""
+        subscriber = Subscriber(asyncio.get_running_loop(), max_pending)
+        with self._lock:
+            self._subscribers.setdefault(subscriber.loop, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.loop)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[subscriber.loop]
+
+    def publish(self, deltas: Dict[int, Sequence[int]]):
+        """Queue deltas for every subscriber; safe to call from any thread"""
+        wake = []
+        with self._lock:
+            for loop in self._subscribers:
+                inbox = self._inboxes.get(loop)
+                if inbox is None:
+                    inbox = self._inboxes[loop] = {}
+                    wake.append(loop)
+                _merge(inbox, deltas)
+        for loop in wake:
+            try:
+                loop.call_soon_threadsafe(self._dispatch, loop)
+            except RuntimeError:
+                # The event loop has been closed along with its subscribers
+                with self._lock:
+                    self._subscribers.pop(loop, None)
+                    self._inboxes.pop(loop, None)
+
+    def _dispatch(self, loop: asyncio.AbstractEventLoop):
+        with self._lock:
+            inbox = self._inboxes.pop(loop, None)
+            subscribers = list(self._subscribers.get(loop, ()))
+        if inbox:
+            for subscriber in subscribers:
+                subscriber.push(inbox)
+
+score_feed = ScoreFeed()
+
+def record_score_delta(db: Session, student_id: int, attempts: int, correct: int, points: int):
+    """Queue a change to a student's totals; published once the session commits"""
+    on_commit(db, PENDING_KEY, (student_id, attempts, correct, points))
+
+def _publish_committed(changes: List[Tuple[int, int, int, int]]):
+    deltas: Deltas = {}
+    for student_id, attempts, correct, points in changes:
+        _merge(deltas, {student_id: (attempts, correct, points)})
+    score_feed.publish(deltas)
+
+register_commit_handler(PENDING_KEY, _publish_committed)
@@ -0,0 +1,45 @@
+"""
+Lightweight schema upgrades for existing databases.
+
+``Base.metadata.create_all`` creates missing tables but never touches tables
+that already exist, so nullable columns and indexes added to the models later
+are created here.
+"""
+from sqlalchemy import delete, func, inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn
+from app.database import Base
+from app.models import UserAchievement
+
+def _remove_duplicate_user_achievements(connection):
+    """Keep the first unlock of each (user, achievement) before the unique index is built"""
+    first_unlocks = select(func.min(UserAchievement.id)).group_by(
+        UserAchievement.user_id, UserAchievement.achievement_id
+    )
+    connection.execute(delete(UserAchievement).where(UserAchievement.id.not_in(first_unlocks)))
+
+def upgrade_schema(engine: Engine) -> list:
+    """Add missing nullable columns and indexes; returns the names created"""
+    created = []
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in columns or not column.nullable:
+                    continue
+                ddl = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                created.append(f"{table.name}.{column.name}")
+            
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+                if table.name == UserAchievement.__tablename__ and index.unique:
+                    _remove_duplicate_user_achievements(connection)
+                index.create(connection)
+                created.append(index.name)
+    return created
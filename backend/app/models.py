@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON, Float, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -35,7 +35,7 @@ class Question(Base):
     __tablename__ = "questions"
     
     id = Column(Integer, primary_key=True, index=True)
-    subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=False)
+    subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=False, index=True)
     question_type = Column(String, nullable=False)  # "multiple_choice", "drag_drop", "fill_blank", "true_false"
     question_text = Column(Text, nullable=False)
     options = Column(JSON)  # For multiple choice: ["option1", "option2", ...]
@@ -63,12 +63,23 @@ class QuizSubmission(Base):
     # Relationships
     student = relationship("User", back_populates="quiz_submissions")
     question = relationship("Question", back_populates="quiz_submissions")
+    
+    __table_args__ = (
+        # A student's submissions, and their latest answer to one question
+        Index("ix_quiz_submissions_student_question", "student_id", "question_id"),
+        # A student's submissions within a date range
+        Index("ix_quiz_submissions_student_submitted", "student_id", "submitted_at"),
+        # Per-question aggregates and joins from questions
+        Index("ix_quiz_submissions_question_id", "question_id"),
+        # Never reuse ids of archived rows; cursors and archive roll-ups rely on them
+        {'sqlite_autoincrement': True},
+    )
 
 class Feedback(Base):
     __tablename__ = "feedbacks"
     
     id = Column(Integer, primary_key=True, index=True)
-    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     admin_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     message = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -120,6 +131,100 @@ class UserAchievement(Base):
     
     # Unique constraint: user can only have each achievement once
     __table_args__ = (
+        Index("ix_user_achievements_user_achievement", "user_id", "achievement_id", unique=True),
         {'sqlite_autoincrement': True},
     )
 
+
+class StudentSubjectStats(Base):
+    __tablename__ = "student_subject_stats"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    correct = Column(Integer, default=0, nullable=False)
+    points = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Relationships
+    student = relationship("User")
+    subject = relationship("Subject")
+    
+    # One materialized row per student and subject
+    __table_args__ = (
+        UniqueConstraint("student_id", "subject_id", name="uq_student_subject_stats"),
+    )
+
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+    
+    # One counter per cached table, e.g. "questions"; bumped on every write
+    name = Column(String, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, nullable=True)
+
+class SubmissionSummary(Base):
+    __tablename__ = "submission_summaries"
+    
+    # Compact roll-up of archived quiz_submissions rows per student and question
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False, index=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    correct_attempts = Column(Integer, default=0, nullable=False)
+    points_earned = Column(Integer, default=0, nullable=False)
+    best_points = Column(Integer, default=0, nullable=False)
+    ever_correct = Column(Boolean, default=False, nullable=False)
+    first_submitted_at = Column(DateTime(timezone=True))
+    last_submission_id = Column(Integer, nullable=False)
+    last_answer = Column(JSON, nullable=False)
+    last_is_correct = Column(Boolean, nullable=False)
+    last_points_earned = Column(Integer, default=0, nullable=False)
+    last_submitted_at = Column(DateTime(timezone=True))
+    
+    __table_args__ = (
+        Index("ix_submission_summaries_student_question", "student_id", "question_id", unique=True),
+    )
+
+class StudentRating(Base):
+    __tablename__ = "student_ratings"
+    
+    # Elo-style ability estimate of a student within a subject
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=False)
+    rating = Column(Float, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("student_id", "subject_id", name="uq_student_ratings"),
+    )
+
+class QuestionRating(Base):
+    __tablename__ = "question_ratings"
+    
+    # Elo-style difficulty estimate of a question; kept apart from questions
+    # so rating updates do not invalidate the question cache
+    question_id = Column(Integer, ForeignKey("questions.id"), primary_key=True)
+    rating = Column(Float, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+
+class ReviewSchedule(Base):
+    __tablename__ = "review_schedules"
+    
+    # SM-2 spaced-repetition state of one question for one student
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False)
+    repetitions = Column(Integer, default=0, nullable=False)
+    interval_days = Column(Float, default=0, nullable=False)
+    ease_factor = Column(Float, default=2.5, nullable=False)
+    due_at = Column(DateTime, nullable=False)
+    last_reviewed_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_review_schedules_student_question", "student_id", "question_id", unique=True),
+        Index("ix_review_schedules_student_due", "student_id", "due_at"),
+    )
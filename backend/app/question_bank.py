@@ -0,0 +1,158 @@
+"""
+Bulk import and export of the question bank as CSV or JSON Lines.
+
+Rows are validated with ``QuestionCreate`` and written in chunks: each chunk is
+one multi-row INSERT and one transaction, so a large file loads quickly and a
+failure only loses the chunk being written. Invalid rows are skipped and
+reported with their row number.
+
+In CSV files ``options`` and ``correct_answer`` hold JSON, e.g.
+``["3","4","5"]`` and ``{"selected": 1}``.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.graders import GRADERS, compile_grader
+from app.models import Question, Subject
+from app.question_cache import invalidate_questions
+from app.schemas import QuestionCreate
+
+FORMATS = ("csv", "jsonl")
+CSV_COLUMNS = ["subject_id", "question_type", "question_text", "options", "correct_answer", "explanation", "points"]
+JSON_COLUMNS = ("options", "correct_answer")
+MAX_REPORTED_ERRORS = 1000
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    failed: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    def add_error(self, row: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+def format_from_filename(filename: Optional[str]) -> Optional[str]:
+    if filename:
+        extension = filename.rsplit(".", 1)[-1].lower()
+        if extension in FORMATS:
+            return extension
+        if extension in ("json", "ndjson"):
+            return "jsonl"
+    return None
+
+def _read_csv(stream: IO[str]) -> Iterator[Tuple[int, Any]]:
+    # Row 1 is the header
+    for row_number, row in enumerate(csv.DictReader(stream), start=2):
+        try:
+            record = {key: value for key, value in row.items() if key and value not in (None, "")}
+            for column in JSON_COLUMNS:
+                if column in record:
+                    record[column] = json.loads(record[column])
+            yield row_number, record
+        except json.JSONDecodeError as e:
+            yield row_number, ValueError(f"JSON tidak valid: {e}")
+
+def _read_jsonl(stream: IO[str]) -> Iterator[Tuple[int, Any]]:
+    for row_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield row_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, ValueError(f"JSON tidak valid: {e}")
+
+def read_records(stream: IO[str], fmt: str) -> Iterator[Tuple[int, Any]]:
+    """``(row_number, record)`` pairs; unparsable rows yield an exception instead of a record"""
+    return _read_csv(stream) if fmt == "csv" else _read_jsonl(stream)
+
+def _validate(record: Any, subject_ids: set) -> Dict[str, Any]:
+    if isinstance(record, Exception):
+        raise record
+    question = QuestionCreate.model_validate(record)
+    if question.subject_id not in subject_ids:
+        raise ValueError(f"Mata pelajaran {question.subject_id} tidak ditemukan")
+    if question.question_type not in GRADERS:
+        raise ValueError(f"Tipe pertanyaan tidak dikenal: {question.question_type}")
+    compile_grader(question.question_type, question.correct_answer)
+    return question.dict()
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}"
+            for detail in error.errors()
+        )
+    return str(error)
+
+def _insert_chunk(db: Session, rows: List[Dict[str, Any]]):
+    db.execute(insert(Question), rows)
+    invalidate_questions(db)
+    db.commit()
+
+def import_questions(db: Session, records: Iterable[Tuple[int, Any]], chunk_size: int = 1000) -> ImportResult:
+    """Validate and insert questions, committing every ``chunk_size`` valid rows"""
+    subject_ids = {subject_id for (subject_id,) in db.query(Subject.id)}
+    result = ImportResult()
+    chunk: List[Dict[str, Any]] = []
+
+    for row_number, record in records:
+        try:
+            chunk.append(_validate(record, subject_ids))
+        except (ValidationError, ValueError, TypeError, AttributeError) as e:
+            result.add_error(row_number, _error_message(e))
+            continue
+        if len(chunk) >= chunk_size:
+            _insert_chunk(db, chunk)
+            result.imported += len(chunk)
+            chunk = []
+
+    if chunk:
+        _insert_chunk(db, chunk)
+        result.imported += len(chunk)
+    return result
+
+def _export_row(question: Question) -> Dict[str, Any]:
+    return {
+        "id": question.id,
+        "subject_id": question.subject_id,
+        "question_type": question.question_type,
+        "question_text": question.question_text,
+        "options": question.options,
+        "correct_answer": question.correct_answer,
+        "explanation": question.explanation,
+        "points": question.points,
+    }
+
+def export_questions(db: Session, fmt: str, subject_id: Optional[int] = None) -> Iterator[str]:
+    """Encoded lines of the question bank in id order, in a format ``import_questions`` accepts"""
+    query = db.query(Question).order_by(Question.id)
+    if subject_id is not None:
+        query = query.filter(Question.subject_id == subject_id)
+    questions = query.yield_per(1000)
+
+    if fmt == "jsonl":
+        for question in questions:
+            yield json.dumps(_export_row(question), ensure_ascii=False) + "\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=["id"] + CSV_COLUMNS)
+    writer.writeheader()
+    for question in questions:
+        row = _export_row(question)
+        for column in JSON_COLUMNS:
+            if row[column] is not None:
+                row[column] = json.dumps(row[column], ensure_ascii=False)
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
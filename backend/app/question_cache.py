@@ -0,0 +1,197 @@
+"""
+Process-local cache of the question bank.
+
+Questions change only when an admin edits them, so their validated response
+models and encoded JSON are kept in a bounded LRU keyed by question id,
+together with the list of question ids per subject. List endpoints join the
+encoded fragments instead of validating and serializing every row again.
+Every lookup first compares the cache generation with the ``questions``
+version counter in the database, so edits made through any worker invalidate
+the caches of all workers.
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+from fastapi import Response
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.graders import Grader, compile_grader
+from app.models import Question
+from app.schemas import QuestionResponse
+from app.versions import bump_version, get_version
+
+QUESTIONS_VERSION = "questions"
+QUESTION_CACHE_SIZE = settings.question_cache_size
+
+@dataclass(frozen=True)
+class CachedQuestion:
+    """Immutable snapshot of a question, safe to share between requests"""
+    id: int
+    subject_id: int
+    question_type: str
+    correct_answer: Dict[str, Any]
+    points: int
+    data: QuestionResponse
+    json: bytes
+    grader: Grader
+
+    @classmethod
+    def from_model(cls, question: Union[Question, Mapping[str, Any]]) -> "CachedQuestion":
+        data = QuestionResponse.model_validate(question)
+        return cls(
+            id=data.id,
+            subject_id=data.subject_id,
+            question_type=data.question_type,
+            correct_answer=data.correct_answer,
+            points=data.points,
+            data=data,
+            json=data.model_dump_json().encode(),
+            grader=compile_grader(data.question_type, data.correct_answer)
+        )
+
+class QuestionCache:
+    def __init__(self, max_size: int = QUESTION_CACHE_SIZE):
+        self.max_size = max_size
+        self.generation = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._questions: "OrderedDict[int, CachedQuestion]" = OrderedDict()
+        self._subjects: "OrderedDict[int, Tuple[int, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._questions.clear()
+            self._subjects.clear()
+            self.generation = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "generation": self.generation,
+            "size": len(self._questions),
+            "subjects": len(self._subjects),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _sync(self, db: Session) -> int:
+        """Drop everything if another writer bumped the version since we last looked"""
+        version = get_version(db, QUESTIONS_VERSION)
+        with self._lock:
+            if version != self.generation:
+                self._questions.clear()
+                self._subjects.clear()
+                self.generation = version
+        return version
+
+    def _store(self, generation: int, entries: Iterable[CachedQuestion]):
+        with self._lock:
+            if generation != self.generation:
+                return
+            for entry in entries:
+                self._questions[entry.id] = entry
+                self._questions.move_to_end(entry.id)
+            while len(self._questions) > self.max_size:
+                self._questions.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, db: Session, question_id: int) -> Optional[CachedQuestion]:
+        return self.get_many(db, [question_id]).get(question_id)
+
+    def get_many(self, db: Session, question_ids: Iterable[int]) -> Dict[int, CachedQuestion]:
+        """Look up questions by id; ids that do not exist are absent from the result"""
+        return self._get_many(db, self._sync(db), question_ids)
+
+    def _get_many(self, db: Session, generation: int, question_ids: Iterable[int]) -> Dict[int, CachedQuestion]:
+        found: Dict[int, CachedQuestion] = {}
+        missing: List[int] = []
+        with self._lock:
+            for question_id in set(question_ids):
+                entry = self._questions.get(question_id)
+                if entry is None:
+                    missing.append(question_id)
+                else:
+                    self._questions.move_to_end(question_id)
+                    found[question_id] = entry
+            self.hits += len(found)
+            self.misses += len(missing)
+        
+        if missing:
+            loaded = [
+                CachedQuestion.from_model(question)
+                for question in db.query(Question).filter(Question.id.in_(missing))
+            ]
+            self._store(generation, loaded)
+            found.update((entry.id, entry) for entry in loaded)
+        return found
+
+    def get_subject(self, db: Session, subject_id: int) -> List[CachedQuestion]:
+        """All questions of a subject in insertion order"""
+        generation = self._sync(db)
+        with self._lock:
+            question_ids = self._subjects.get(subject_id)
+            if question_ids is not None:
+                self._subjects.move_to_end(subject_id)
+        
+        if question_ids is not None:
+            entries = self._get_many(db, generation, question_ids)
+            if len(entries) == len(question_ids):
+                return [entries[question_id] for question_id in question_ids]
+        
+        with self._lock:
+            self.misses += 1
+        loaded = [
+            CachedQuestion.from_model(question)
+            for question in db.query(Question).filter(
+                Question.subject_id == subject_id
+            ).order_by(Question.id)
+        ]
+        self._store(generation, loaded)
+        with self._lock:
+            if generation == self.generation:
+                self._subjects[subject_id] = tuple(entry.id for entry in loaded)
+                while len(self._subjects) > self.max_size:
+                    self._subjects.popitem(last=False)
+        return loaded
+
+    def get_all(self, db: Session) -> List[CachedQuestion]:
+        """Every question in id order
+
+        A bank larger than the cache is listed without storing it, so the
+        listing cannot evict the entries that submissions and per-subject
+        listings rely on; cached entries are reused where present.
+        """
+        generation = self._sync(db)
+        if db.query(func.count(Question.id)).scalar() <= self.max_size:
+            question_ids = [question_id for (question_id,) in db.query(Question.id).order_by(Question.id)]
+            entries = self._get_many(db, generation, question_ids)
+            return [entries[question_id] for question_id in question_ids if question_id in entries]
+        
+        with self._lock:
+            cached = dict(self._questions)
+        # Plain rows are enough to build entries and skip the ORM identity map
+        rows = db.execute(select(Question.__table__).order_by(Question.id).execution_options(yield_per=1000))
+        return [
+            cached.get(row.id) or CachedQuestion.from_model(dict(row._mapping))
+            for row in rows
+        ]
+
+question_cache = QuestionCache()
+
+def question_json_response(entry: CachedQuestion, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(content=entry.json, media_type="application/json", headers=headers)
+
+def question_list_response(entries: Iterable[CachedQuestion], headers: Optional[Dict[str, str]] = None) -> Response:
+    """A JSON array response assembled from the cached fragments"""
+    content = b"[" + b",".join(entry.json for entry in entries) + b"]"
+    return Response(content=content, media_type="application/json", headers=headers)
+
+def invalidate_questions(db: Session):
+    """Mark every cached question stale; call inside the writing transaction"""
+    bump_version(db, QUESTIONS_VERSION)
+    question_cache.clear()
@@ -0,0 +1,122 @@
+"""
+Server-side quiz sessions.
+
+Starting a quiz draws a set of questions for the student once, keeps the
+cached question snapshots in a process-local TTL cache and serializes the
+answer-free payload a single time. Submits that reference the session are
+graded against those snapshots without another lookup.
+"""
+import random
+import secrets
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import select, union
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import QuizSubmission, SubmissionSummary
+from app.question_cache import CachedQuestion, question_cache
+from app.ratings import get_student_rating, question_pool
+from app.schemas import QuizQuestion, QuizSessionResponse
+from app.ttl_cache import TTLCache
+
+@dataclass(frozen=True)
+class QuizSession:
+    id: str
+    student_id: int
+    subject_id: int
+    mode: str
+    questions: Dict[int, CachedQuestion]
+    payload: bytes
+
+quiz_sessions: TTLCache[QuizSession] = TTLCache(
+    max_size=settings.quiz_session_cache_size,
+    ttl_seconds=settings.quiz_session_ttl_seconds
+)
+
+def quiz_question(entry: CachedQuestion) -> QuizQuestion:
+    """The answer-free view of a question shown while it is being answered"""
+    return QuizQuestion(
+        id=entry.id,
+        subject_id=entry.subject_id,
+        question_type=entry.question_type,
+        question_text=entry.data.question_text,
+        options=entry.data.options,
+        points=entry.points
+    )
+
+def _solved_question_ids(db: Session, student_id: int, question_ids: List[int]) -> set:
+    """Questions the student has answered correctly at least once, archived history included"""
+    live = select(QuizSubmission.question_id).where(
+        QuizSubmission.student_id == student_id,
+        QuizSubmission.question_id.in_(question_ids),
+        QuizSubmission.is_correct.is_(True)
+    )
+    archived = select(SubmissionSummary.question_id).where(
+        SubmissionSummary.student_id == student_id,
+        SubmissionSummary.question_id.in_(question_ids),
+        SubmissionSummary.ever_correct.is_(True)
+    )
+    return set(db.execute(union(live, archived)).scalars())
+
+def select_questions(
+    db: Session,
+    student_id: int,
+    subject_id: int,
+    pool: List[CachedQuestion],
+    count: int,
+    mode: str
+) -> List[CachedQuestion]:
+    """Draw ``count`` questions from ``pool``
+
+    Random mode shuffles the whole pool. Adaptive mode picks questions near
+    the student's rating (see ``app.ratings``), preferring ones not solved yet.
+    """
+    if mode != "adaptive":
+        return random.sample(pool, min(count, len(pool)))
+    
+    solved = _solved_question_ids(db, student_id, [entry.id for entry in pool])
+    return question_pool.select(
+        subject_id,
+        pool,
+        question_cache.generation,
+        get_student_rating(db, student_id, subject_id),
+        count,
+        avoid=solved
+    )
+
+def create_session(db: Session, student_id: int, subject_id: int, count: int, mode: str) -> Optional[QuizSession]:
+    """Start a session, or return None if the subject has no questions"""
+    pool = question_cache.get_subject(db, subject_id)
+    if not pool:
+        return None
+    questions = select_questions(db, student_id, subject_id, pool, count, mode)
+    
+    session_id = secrets.token_urlsafe(16)
+    payload = QuizSessionResponse(
+        session_id=session_id,
+        subject_id=subject_id,
+        mode=mode,
+        expires_at=datetime.utcnow() + timedelta(seconds=quiz_sessions.ttl_seconds),
+        questions=[
+            quiz_question(entry) for entry in questions
+        ]
+    ).model_dump_json().encode()
+    
+    session = QuizSession(
+        id=session_id,
+        student_id=student_id,
+        subject_id=subject_id,
+        mode=mode,
+        questions={entry.id: entry for entry in questions},
+        payload=payload
+    )
+    quiz_sessions.set(session_id, session)
+    return session
+
+def get_session(session_id: str, student_id: int) -> Optional[QuizSession]:
+    """The student's live session, or None if it expired or belongs to someone else"""
+    session = quiz_sessions.get(session_id)
+    if session is None or session.student_id != student_id:
+        return None
+    return session
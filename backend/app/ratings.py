@@ -0,0 +1,289 @@
+"""
+Elo-style mastery estimates and adaptive question selection.
+
+Every student has a rating per subject and every question a difficulty rating
+on the same scale. The chance that a student answers a question correctly (the
+student's mastery of that question) is the Elo expectation of the two ratings,
+so no per-student, per-question state has to be stored. Each graded answer
+moves both ratings toward the observed outcome.
+
+Student ratings are updated in the submit transaction. Question ratings are
+shared by every student answering the question, so they are kept in a sorted
+in-memory pool per subject instead: a submit reads the difficulty from the
+pool, the change is applied in memory once the session commits, and the
+accumulated changes are written in one batch every
+``QUESTION_RATING_FLUSH_SECONDS``. Each flush also reloads the ratings
+written by other workers. The questions closest to a student's target
+difficulty are found with a binary search.
+"""
+import asyncio
+import logging
+import math
+import random
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal, conflict_insert, on_commit, register_commit_handler
+from app.models import Question, QuestionRating, StudentRating
+from app.question_cache import CachedQuestion
+
+DEFAULT_RATING = 1000.0
+ELO_SCALE = 400.0
+# K shrinks as a rating accumulates evidence, from K_MAX towards K_MIN
+K_MAX = 48.0
+K_MIN = 12.0
+K_DECAY_ATTEMPTS = 20
+# Adaptive quizzes aim for questions answered correctly about 70% of the time
+TARGET_SUCCESS = 0.7
+PENDING_KEY = "question_rating_updates"
+
+logger = logging.getLogger(__name__)
+
+def expected_score(student_rating: float, question_rating: float) -> float:
+    """Probability that the student answers the question correctly"""
+    return 1.0 / (1.0 + 10 ** ((question_rating - student_rating) / ELO_SCALE))
+
+def target_rating(student_rating: float, success: float = TARGET_SUCCESS) -> float:
+    """Question rating the student is expected to answer correctly with probability ``success``"""
+    return student_rating + ELO_SCALE * math.log10(1 / success - 1)
+
+def _k_factor(attempts: int) -> float:
+    return max(K_MIN, K_MAX / (1 + attempts / K_DECAY_ATTEMPTS))
+
+def _load_ratings(db: Session, model, key: str, keys: Set[int], criteria: tuple, unique: List[str], new_row) -> Dict[int, dict]:
+    """Rating rows keyed by ``key``, locked for update and created with defaults when missing"""
+    table = model.__table__
+    
+    def load():
+        # Lock rows in key order so concurrent batches cannot deadlock
+        rows = db.execute(
+            select(table).where(*criteria, table.c[key].in_(keys)).order_by(table.c[key]).with_for_update()
+        )
+        return {row._mapping[key]: dict(row._mapping) for row in rows}
+    
+    ratings = load()
+    missing = keys - ratings.keys()
+    if missing:
+        rows = [new_row(value) for value in sorted(missing)]
+        statement = conflict_insert(db, model)
+        if statement is None:
+            db.add_all(model(**row) for row in rows)
+            db.flush()
+        else:
+            db.execute(statement.values(rows).on_conflict_do_nothing(index_elements=unique))
+        ratings = load()
+    return ratings
+
+def _store_ratings(db: Session, primary_key, rows: Iterable[dict]):
+    table = primary_key.table
+    db.execute(
+        update(table).where(primary_key == bindparam("row_id")).values(
+            rating=bindparam("new_rating"),
+            attempts=bindparam("new_attempts")
+        ),
+        [
+            {"row_id": row[primary_key.name], "new_rating": row["rating"], "new_attempts": row["attempts"]}
+            for row in rows
+        ]
+    )
+
+def update_ratings(db: Session, student_id: int, graded: Sequence[Tuple[CachedQuestion, bool]]):
+    """Apply ``(question, is_correct)`` outcomes in order to the student's ratings (no commit)
+
+    Question difficulties come from ``question_pool``; their changes are
+    queued on the session and reach the pool when it commits.
+    """
+    students = _load_ratings(
+        db, StudentRating, "subject_id", {question.subject_id for question, _ in graded},
+        (StudentRating.student_id == student_id,), ["student_id", "subject_id"],
+        lambda subject_id: {"student_id": student_id, "subject_id": subject_id, "rating": DEFAULT_RATING, "attempts": 0}
+    )
+    questions = question_pool.difficulties({question.id for question, _ in graded})
+    pending: Dict[int, list] = {}
+    
+    for question, is_correct in graded:
+        student = students[question.subject_id]
+        difficulty = questions[question.id]
+        surprise = (1.0 if is_correct else 0.0) - expected_score(student["rating"], difficulty[0])
+        student["rating"] += _k_factor(student["attempts"]) * surprise
+        student["attempts"] += 1
+        change = _k_factor(difficulty[1]) * surprise
+        difficulty[0] -= change
+        difficulty[1] += 1
+        queued = pending.setdefault(question.id, [question.subject_id, 0.0, 0])
+        queued[1] -= change
+        queued[2] += 1
+    
+    _store_ratings(db, StudentRating.__table__.c.id, students.values())
+    on_commit(db, PENDING_KEY, pending)
+
+def get_student_rating(db: Session, student_id: int, subject_id: int) -> float:
+    rating = db.query(StudentRating.rating).filter(
+        StudentRating.student_id == student_id,
+        StudentRating.subject_id == subject_id
+    ).scalar()
+    return DEFAULT_RATING if rating is None else rating
+
+class QuestionPool:
+    """Questions of each subject ordered by difficulty rating"""
+
+    def __init__(self):
+        self._ratings: Dict[int, float] = {}
+        self._attempts: Dict[int, int] = {}
+        # question_id -> [subject_id, rating change, attempts] not yet written to the database
+        self._unsaved: Dict[int, list] = {}
+        # subject_id -> (question cache generation, sorted (rating, id) keys, entries by id)
+        self._pools: Dict[int, Tuple[Optional[int], List[Tuple[float, int]], Dict[int, CachedQuestion]]] = {}
+        self._lock = threading.Lock()
+
+    def rebuild(self, db: Session):
+        ratings = {}
+        attempts = {}
+        for question_id, rating, count in db.query(QuestionRating.question_id, QuestionRating.rating, QuestionRating.attempts):
+            ratings[question_id] = rating
+            attempts[question_id] = count
+        with self._lock:
+            self._ratings = ratings
+            self._attempts = attempts
+            self._pools = {}
+
+    def difficulties(self, question_ids: Iterable[int]) -> Dict[int, list]:
+        """``{question_id: [rating, attempts]}`` copies of the current values"""
+        with self._lock:
+            return {
+                question_id: [self._ratings.get(question_id, DEFAULT_RATING), self._attempts.get(question_id, 0)]
+                for question_id in question_ids
+            }
+
+    def _move(self, subject_id: int, question_id: int, rating: float):
+        """Set a rating and keep the subject's pool sorted (caller holds the lock)"""
+        old_rating = self._ratings.get(question_id, DEFAULT_RATING)
+        self._ratings[question_id] = rating
+        pool = self._pools.get(subject_id)
+        if pool is None:
+            return
+        keys = pool[1]
+        position = bisect_left(keys, (old_rating, question_id))
+        if position < len(keys) and keys[position] == (old_rating, question_id):
+            del keys[position]
+            insort(keys, (rating, question_id))
+
+    def apply(self, changes: Dict[int, list]):
+        """Add committed ``{question_id: [subject_id, rating change, attempts]}`` changes"""
+        with self._lock:
+            for question_id, (subject_id, change, attempts) in changes.items():
+                self._move(subject_id, question_id, self._ratings.get(question_id, DEFAULT_RATING) + change)
+                self._attempts[question_id] = self._attempts.get(question_id, 0) + attempts
+                unsaved = self._unsaved.setdefault(question_id, [subject_id, 0.0, 0])
+                unsaved[1] += change
+                unsaved[2] += attempts
+
+    def flush(self, db: Session):
+        """Write the unsaved changes in one transaction, then reload every question's rating"""
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, {}
+        if unsaved:
+            try:
+                rows = _load_ratings(
+                    db, QuestionRating, "question_id", set(unsaved), (), ["question_id"],
+                    lambda question_id: {"question_id": question_id, "rating": DEFAULT_RATING, "attempts": 0}
+                )
+                for question_id, (_, change, attempts) in unsaved.items():
+                    rows[question_id]["rating"] += change
+                    rows[question_id]["attempts"] += attempts
+                _store_ratings(db, QuestionRating.__table__.c.question_id, rows.values())
+                db.commit()
+            except Exception:
+                db.rollback()
+                with self._lock:
+                    for question_id, (subject_id, change, attempts) in unsaved.items():
+                        pending = self._unsaved.setdefault(question_id, [subject_id, 0.0, 0])
+                        pending[1] += change
+                        pending[2] += attempts
+                raise
+        
+        stored = db.query(
+            QuestionRating.question_id, Question.subject_id, QuestionRating.rating, QuestionRating.attempts
+        ).join(Question, Question.id == QuestionRating.question_id).all()
+        with self._lock:
+            for question_id, subject_id, rating, attempts in stored:
+                # Changes committed here since the swap above are not in the database yet
+                pending = self._unsaved.get(question_id)
+                if pending is not None:
+                    rating += pending[1]
+                    attempts += pending[2]
+                if self._ratings.get(question_id) != rating:
+                    self._move(subject_id, question_id, rating)
+                self._attempts[question_id] = attempts
+
+    def _pool(self, subject_id: int, entries: Iterable[CachedQuestion], generation: Optional[int]):
+        """The subject's sorted pool, rebuilt when the question set changed (caller holds the lock)"""
+        pool = self._pools.get(subject_id)
+        if pool is None or pool[0] != generation:
+            by_id = {entry.id: entry for entry in entries}
+            keys = sorted((self._ratings.get(question_id, DEFAULT_RATING), question_id) for question_id in by_id)
+            pool = (generation, keys, by_id)
+            self._pools[subject_id] = pool
+        return pool
+
+    def select(
+        self,
+        subject_id: int,
+        entries: Sequence[CachedQuestion],
+        generation: Optional[int],
+        student_rating: float,
+        count: int,
+        avoid: Set[int] = frozenset()
+    ) -> List[CachedQuestion]:
+        """Pick ``count`` questions near the student's target difficulty, easiest first
+
+        Candidates are the ``2 * count`` questions closest to the target rating,
+        skipping ``avoid`` unless there are not enough other questions; the
+        result is a random sample of them so repeated quizzes vary.
+        """
+        target = target_rating(student_rating)
+        candidates: List[int] = []
+        fallback: List[int] = []
+        with self._lock:
+            _, keys, by_id = self._pool(subject_id, entries, generation)
+            below = bisect_left(keys, (target,)) - 1
+            above = below + 1
+            while len(candidates) < 2 * count and (below >= 0 or above < len(keys)):
+                if above >= len(keys) or (below >= 0 and target - keys[below][0] <= keys[above][0] - target):
+                    question_id = keys[below][1]
+                    below -= 1
+                else:
+                    question_id = keys[above][1]
+                    above += 1
+                (fallback if question_id in avoid else candidates).append(question_id)
+
+            chosen = random.sample(candidates, min(count, len(candidates)))
+            chosen += fallback[:count - len(chosen)]
+            chosen.sort(key=lambda question_id: (self._ratings.get(question_id, DEFAULT_RATING), question_id))
+
+        return [by_id[question_id] for question_id in chosen]
+
+question_pool = QuestionPool()
+
+def flush_question_ratings():
+    with SessionLocal() as db:
+        question_pool.flush(db)
+
+async def flush_question_ratings_periodically(interval: float = settings.question_rating_flush_seconds):
+    """Run ``flush_question_ratings`` every ``interval`` seconds until cancelled"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(flush_question_ratings)
+        except Exception:
+            logger.exception("Question rating flush failed")
+
+def _apply_committed(batches: List[Dict[int, list]]):
+    for changes in batches:
+        question_pool.apply(changes)
+
+register_commit_handler(PENDING_KEY, _apply_committed)
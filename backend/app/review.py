@@ -0,0 +1,123 @@
+"""
+Spaced-repetition review scheduling (SM-2).
+
+Every graded answer updates the student's schedule for that question: a
+correct answer given when the question is due pushes the next review further
+out, a wrong answer brings the question back the next day. Correct answers
+before the due time leave the schedule alone, so practising ahead does not
+inflate the intervals. The review queue is read through the
+``(student_id, due_at)`` index, so serving the next N due items costs the
+same no matter how many schedule rows exist.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Sequence, Tuple
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+from app.database import conflict_insert
+from app.models import ReviewSchedule
+
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+# SM-2 answer quality (0-5); the quiz only knows right or wrong
+QUALITY_CORRECT = 4
+QUALITY_WRONG = 1
+MAX_INTERVAL_DAYS = 365
+
+def next_schedule(repetitions: int, interval_days: float, ease_factor: float, quality: int) -> Tuple[int, float, float]:
+    """SM-2 step: the new ``(repetitions, interval_days, ease_factor)``"""
+    if quality >= 3:
+        if repetitions == 0:
+            interval_days = 1
+        elif repetitions == 1:
+            interval_days = 6
+        else:
+            interval_days = min(interval_days * ease_factor, MAX_INTERVAL_DAYS)
+        repetitions += 1
+    else:
+        repetitions = 0
+        interval_days = 1
+    ease_factor += 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+    return repetitions, interval_days, max(MIN_EASE, ease_factor)
+
+def schedule_reviews(db: Session, student_id: int, outcomes: Sequence[Tuple[int, bool]], reviewed_at: datetime):
+    """Apply ``(question_id, is_correct)`` outcomes in order to the student's schedule (no commit)"""
+    table = ReviewSchedule.__table__
+    question_ids = {question_id for question_id, _ in outcomes}
+    rows = db.execute(
+        select(
+            table.c.id, table.c.question_id, table.c.repetitions,
+            table.c.interval_days, table.c.ease_factor, table.c.due_at
+        )
+        .where(table.c.student_id == student_id, table.c.question_id.in_(question_ids))
+        .order_by(table.c.question_id)
+        .with_for_update()
+    )
+    existing: Dict[int, dict] = {row.question_id: dict(row._mapping) for row in rows}
+    created: Dict[int, dict] = {}
+    
+    for question_id, is_correct in outcomes:
+        schedule = existing.get(question_id) or created.get(question_id)
+        if schedule is None:
+            schedule = created[question_id] = {
+                "student_id": student_id,
+                "question_id": question_id,
+                "repetitions": 0,
+                "interval_days": 0.0,
+                "ease_factor": INITIAL_EASE,
+                "due_at": reviewed_at,
+            }
+        if is_correct and schedule["due_at"] > reviewed_at:
+            schedule["last_reviewed_at"] = reviewed_at
+            continue
+        repetitions, interval_days, ease_factor = next_schedule(
+            schedule["repetitions"],
+            schedule["interval_days"],
+            schedule["ease_factor"],
+            QUALITY_CORRECT if is_correct else QUALITY_WRONG
+        )
+        schedule.update(
+            repetitions=repetitions,
+            interval_days=interval_days,
+            ease_factor=ease_factor,
+            due_at=reviewed_at + timedelta(days=interval_days),
+            last_reviewed_at=reviewed_at
+        )
+    
+    if existing:
+        db.execute(
+            update(table).where(table.c.id == bindparam("schedule_id")).values(
+                repetitions=bindparam("new_repetitions"),
+                interval_days=bindparam("new_interval_days"),
+                ease_factor=bindparam("new_ease_factor"),
+                due_at=bindparam("new_due_at"),
+                last_reviewed_at=bindparam("new_last_reviewed_at")
+            ),
+            [
+                {
+                    "schedule_id": schedule["id"],
+                    "new_repetitions": schedule["repetitions"],
+                    "new_interval_days": schedule["interval_days"],
+                    "new_ease_factor": schedule["ease_factor"],
+                    "new_due_at": schedule["due_at"],
+                    "new_last_reviewed_at": schedule["last_reviewed_at"],
+                }
+                for schedule in existing.values()
+            ]
+        )
+    if created:
+        statement = conflict_insert(db, ReviewSchedule)
+        if statement is None:
+            db.execute(insert(table), list(created.values()))
+        else:
+            # A concurrent request for the same new question keeps its own schedule
+            db.execute(
+                statement.values(list(created.values()))
+                .on_conflict_do_nothing(index_elements=["student_id", "question_id"])
+            )
+
+def due_reviews(db: Session, student_id: int, limit: int, now: datetime) -> List[ReviewSchedule]:
+    """The student's most overdue schedules, at most ``limit``"""
+    return db.query(ReviewSchedule).filter(
+        ReviewSchedule.student_id == student_id,
+        ReviewSchedule.due_at <= now
+    ).order_by(ReviewSchedule.due_at).limit(limit).all()
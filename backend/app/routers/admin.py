@@ -1,9 +1,13 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+from typing import Dict, List, Optional
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.database import get_db
-from app.models import User, QuizSubmission, Question, Subject, Feedback, Achievement
+from sqlalchemy import func, case, and_, or_
+from app.database import get_db, SessionLocal
+from app.models import User, Question, Subject, Feedback, Achievement, StudentSubjectStats
 from app.schemas import (
     FeedbackCreate,
     FeedbackResponse,
@@ -11,9 +15,19 @@ from app.schemas import (
     SubjectCreate,
     SubjectResponse,
     AchievementCreate,
-    AchievementResponse
+    AchievementResponse,
+    QuestionStats,
+    SubjectQuestionReport
 )
-from app.auth import get_current_admin_user
+from app.auth import get_current_admin_user, get_current_user, principal_cache, password_hasher
+from app.config import settings
+from app.achievements import award_existing_qualifiers, invalidate_achievement_cache
+from app.question_cache import question_cache
+from app.analytics import question_stats, subject_report
+from app.gradebook import SCORE_COLUMNS, SUBMISSION_COLUMNS, encode_csv, gzip_chunks, score_rows, submission_rows
+from app.http_cache import Versioned
+from app.live_scores import score_feed
+from app.versions import ACHIEVEMENTS_VERSION, SUBJECTS_VERSION, bump_version
 from app.models import User as UserModel
 
 router = APIRouter()
@@ -35,40 +49,229 @@ def get_all_students(
         for student in students
     ]
 
+def _score_summary_query(db: Session, sort_by: str, after: Optional[str], limit: Optional[int]):
+    """Build the grouped score aggregation over the materialized stats, sorted and keyset-paginated"""
+    total_questions = func.coalesce(func.sum(StudentSubjectStats.attempts), 0)
+    correct_answers = func.coalesce(func.sum(StudentSubjectStats.correct), 0)
+    total_points = func.coalesce(func.sum(StudentSubjectStats.points), 0)
+    accuracy = case(
+        (total_questions > 0, correct_answers * 100.0 / total_questions),
+        else_=0.0
+    )
+
+    query = db.query(
+        User.id.label("student_id"),
+        User.full_name.label("student_name"),
+        total_questions.label("total_questions"),
+        correct_answers.label("correct_answers"),
+        total_points.label("total_points"),
+        accuracy.label("accuracy")
+    ).outerjoin(
+        StudentSubjectStats, StudentSubjectStats.student_id == User.id
+    ).filter(User.is_admin == False).group_by(User.id, User.full_name)
+
+    sort_column = {"points": total_points, "accuracy": accuracy}.get(sort_by)
+
+    if after is not None:
+        try:
+            if sort_column is None:
+                query = query.having(User.id > int(after))
+            else:
+                value, last_id = after.rsplit(",", 1)
+                value = float(value) if sort_by == "accuracy" else int(value)
+                last_id = int(last_id)
+                query = query.having(or_(
+                    sort_column < value,
+                    and_(sort_column == value, User.id > last_id)
+                ))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor tidak valid"
+            )
+
+    if sort_column is None:
+        query = query.order_by(User.id)
+    else:
+        query = query.order_by(sort_column.desc(), User.id)
+
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+def _score_cursor(row, sort_by: str) -> str:
+    if sort_by == "points":
+        return f"{row.total_points},{row.student_id}"
+    if sort_by == "accuracy":
+        return f"{float(row.accuracy)!r},{row.student_id}"
+    return str(row.student_id)
+
+def _encode_scores(rows):
+    """Stream score rows as a JSON array without building the whole list"""
+    yield "["
+    for index, row in enumerate(rows):
+        summary = ScoreSummary(
+            student_id=row.student_id,
+            student_name=row.student_name,
+            total_questions=row.total_questions,
+            correct_answers=row.correct_answers,
+            total_points=row.total_points,
+            accuracy=round(row.accuracy, 2)
+        )
+        yield ("," if index else "") + summary.model_dump_json()
+    yield "]"
+
+def _stream_all_scores(sort_by: str, after: Optional[str]):
+    # The request session may already be closed while the body is streamed,
+    # so the unpaginated listing reads through its own session.
+    db = SessionLocal()
+    try:
+        rows = _score_summary_query(db, sort_by, after, None).yield_per(500)
+        yield from _encode_scores(rows)
+    finally:
+        db.close()
+
 @router.get("/scores", response_model=List[ScoreSummary])
 def get_all_scores(
+    sort_by: str = Query("student_id", pattern="^(student_id|points|accuracy)$"),
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_admin_user)
 ):
-    # Get all students with their scores
-    students = db.query(User).filter(User.is_admin == False).all()
-    score_summaries = []
-    
-    for student in students:
-        submissions = db.query(QuizSubmission).filter(
-            QuizSubmission.student_id == student.id
-        ).all()
-        
-        total_questions = len(submissions)
-        correct_answers = sum(1 for s in submissions if s.is_correct)
-        total_points = sum(s.points_earned for s in submissions)
-        accuracy = (correct_answers / total_questions * 100) if total_questions > 0 else 0
-        
-        score_summaries.append(ScoreSummary(
-            student_id=student.id,
-            student_name=student.full_name,
-            total_questions=total_questions,
-            correct_answers=correct_answers,
-            total_points=total_points,
-            accuracy=round(accuracy, 2)
-        ))
-    
-    return score_summaries
+    """Score summaries for every student, aggregated in a single query.
+
+    Pass ``limit`` to page through the results; the cursor for the next page
+    is returned in the ``X-Next-Cursor`` header and sent back as ``after``.
+    """
+    if limit is None:
+        # Validate the cursor up front so errors are not raised mid-stream
+        _score_summary_query(db, sort_by, after, None)
+        return StreamingResponse(
+            _stream_all_scores(sort_by, after),
+            media_type="application/json"
+        )
+
+    rows = _score_summary_query(db, sort_by, after, limit).all()
+    headers = {}
+    if len(rows) == limit:
+        headers["X-Next-Cursor"] = _score_cursor(rows[-1], sort_by)
+    return StreamingResponse(
+        _encode_scores(rows),
+        media_type="application/json",
+        headers=headers
+    )
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+def _socket_user(token: str):
+    with SessionLocal() as db:
+        return get_current_user(token, db)
+
+@router.websocket("/live/scores")
+async def live_scores(websocket: WebSocket, token: str = Query(...)):
+    """Push per-student score deltas as submissions commit.
+
+    Browsers cannot set headers on a WebSocket, so the bearer token is passed
+    as the ``token`` query parameter. Messages are ``{"type": "deltas",
+    "deltas": [...]}`` to add to the totals from ``/scores``, or
+    ``{"type": "resync"}`` when the client fell too far behind and should
+    reload them.
+    """
+    try:
+        current_user = await run_in_threadpool(_socket_user, token)
+    except HTTPException:
+        current_user = None
+    if current_user is None or not current_user.is_admin:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscriber = score_feed.subscribe()
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(websocket))
+    try:
+        while True:
+            message = asyncio.ensure_future(subscriber.next_message(settings.live_scores_flush_interval_seconds))
+            await asyncio.wait({message, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                message.cancel()
+                break
+            # Deltas published while this send is in flight are merged into the next message
+            await websocket.send_json(message.result())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        disconnected.cancel()
+        score_feed.unsubscribe(subscriber)
+
+EXPORTS = {
+    "submissions": (SUBMISSION_COLUMNS, submission_rows),
+    "scores": (SCORE_COLUMNS, score_rows),
+}
+
+def _stream_export(name: str, since: Optional[datetime], until: Optional[datetime], subject_id: Optional[int], compress: bool):
+    columns, rows = EXPORTS[name]
+    db = SessionLocal()
+    try:
+        chunks = encode_csv(columns, rows(db, since, until, subject_id))
+        yield from gzip_chunks(chunks) if compress else chunks
+    finally:
+        db.close()
+
+@router.get("/export/{name}")
+def export_gradebook(
+    name: str = Path(..., pattern="^(submissions|scores)$"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    subject_id: Optional[int] = None,
+    gzip: bool = False,
+    current_user: UserModel = Depends(get_current_admin_user)
+):
+    """Stream submissions or per-subject scores as CSV, optionally gzip-compressed"""
+    filename = f"{name}.csv.gz" if gzip else f"{name}.csv"
+    return StreamingResponse(
+        _stream_export(name, since, until, subject_id, gzip),
+        media_type="application/gzip" if gzip else "text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/questions/{question_id}/stats", response_model=QuestionStats)
+def get_question_stats(
+    question_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_admin_user)
+):
+    """Difficulty, discrimination and most common wrong answers of a question"""
+    question = db.query(Question).filter(Question.id == question_id).first()
+    if not question:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pertanyaan tidak ditemukan"
+        )
+    return question_stats(db, question)
+
+@router.get("/subjects/{subject_id}/question-stats", response_model=SubjectQuestionReport)
+def get_subject_question_report(
+    subject_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_admin_user)
+):
+    """Item statistics for every question of a subject"""
+    subject = db.query(Subject).filter(Subject.id == subject_id).first()
+    if not subject:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Mata pelajaran tidak ditemukan"
+        )
+    return SubjectQuestionReport(subject_id=subject_id, questions=subject_report(db, subject_id))
 
 @router.get("/subjects", response_model=List[SubjectResponse])
 def get_all_subjects(
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_admin_user)
+    current_user: UserModel = Depends(get_current_admin_user),
+    validators: Dict[str, str] = Depends(Versioned(SUBJECTS_VERSION))
 ):
     subjects = db.query(Subject).all()
     return subjects
@@ -77,7 +280,8 @@ def get_all_subjects(
 def get_subject(
     subject_id: int,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_admin_user)
+    current_user: UserModel = Depends(get_current_admin_user),
+    validators: Dict[str, str] = Depends(Versioned(SUBJECTS_VERSION))
 ):
     subject = db.query(Subject).filter(Subject.id == subject_id).first()
     if not subject:
@@ -103,6 +307,7 @@ def create_subject(
     
     db_subject = Subject(**subject_data.dict())
     db.add(db_subject)
+    bump_version(db, SUBJECTS_VERSION)
     db.commit()
     db.refresh(db_subject)
     return db_subject
@@ -136,6 +341,7 @@ def update_subject(
     # Update fields
     db_subject.name = subject_data.name
     db_subject.description = subject_data.description
+    bump_version(db, SUBJECTS_VERSION)
     db.commit()
     db.refresh(db_subject)
     return db_subject
@@ -162,6 +368,7 @@ def delete_subject(
         )
     
     db.delete(db_subject)
+    bump_version(db, SUBJECTS_VERSION)
     db.commit()
     return None
 
@@ -216,7 +423,32 @@ def create_achievement(
 ):
     db_achievement = Achievement(**achievement_data.dict())
     db.add(db_achievement)
+    db.flush()
+    award_existing_qualifiers(db, db_achievement)
+    bump_version(db, ACHIEVEMENTS_VERSION)
     db.commit()
     db.refresh(db_achievement)
+    invalidate_achievement_cache()
     return db_achievement
 
+
+@router.get("/cache/questions", response_model=dict)
+def get_question_cache_stats(
+    current_user: UserModel = Depends(get_current_admin_user)
+):
+    """Hit/miss counters and size of this worker's question cache"""
+    return question_cache.stats()
+
+@router.get("/cache/principals", response_model=dict)
+def get_principal_cache_stats(
+    current_user: UserModel = Depends(get_current_admin_user)
+):
+    """Hit/miss counters and size of this worker's authenticated-principal cache"""
+    return principal_cache.stats()
+
+@router.get("/metrics/password-hashing", response_model=dict)
+def get_password_hashing_metrics(
+    current_user: UserModel = Depends(get_current_admin_user)
+):
+    """Queue depth and throughput of this worker's bcrypt executor"""
+    return password_hasher.stats()
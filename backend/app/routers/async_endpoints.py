@@ -0,0 +1,69 @@
+"""
+Async variants of the hot endpoints, enabled with ``USE_ASYNC_DB=true``.
+
+They are mounted ahead of the regular routers under the same paths, so they
+take precedence. Database work runs on the async engine; the shared sync
+handler logic is reused through ``AsyncSession.run_sync``, which keeps a
+single implementation of grading, stats and level updates.
+"""
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.schemas import QuizSubmissionCreate, QuizSubmissionResponse, QuestionResponse, StudentProgress, Token
+from app.auth import Principal, authenticate_user_async, get_current_user_async
+from app.http_cache import check_versions
+from app.question_cache import QUESTIONS_VERSION
+from app.versions import SUBJECTS_VERSION
+from app.routers import auth, quizzes, students
+
+router = APIRouter()
+
+@router.post("/auth/login", response_model=Token)
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    user = await authenticate_user_async(db, form_data.username, form_data.password)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Username atau password salah",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return auth.token_response(user)
+
+@router.get("/quizzes/subjects/{subject_id}/questions", response_model=List[QuestionResponse])
+async def get_questions_by_subject(
+    subject_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async)
+):
+    def handle(session):
+        validators = check_versions(session, request, SUBJECTS_VERSION, QUESTIONS_VERSION)
+        return quizzes.get_questions_by_subject(
+            subject_id, db=session, current_user=current_user, validators=validators
+        )
+    
+    return await db.run_sync(handle)
+
+@router.post("/quizzes/submit", response_model=QuizSubmissionResponse)
+async def submit_answer(
+    submission_data: QuizSubmissionCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async)
+):
+    return await db.run_sync(
+        lambda session: quizzes.submit_answer(submission_data, db=session, current_user=current_user)
+    )
+
+@router.get("/students/progress", response_model=StudentProgress)
+async def get_my_progress(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async)
+):
+    return await db.run_sync(
+        lambda session: students.get_my_progress(db=session, current_user=current_user)
+    )
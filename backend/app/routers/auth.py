@@ -1,12 +1,13 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.exc import IntegrityError
+from app.database import SessionLocal
 from app.models import User
 from app.schemas import UserCreate, UserResponse, Token
 from app.auth import (
-    get_password_hash,
+    get_password_hash_async,
     authenticate_user,
     create_access_token,
     ACCESS_TOKEN_EXPIRE_MINUTES
@@ -14,56 +15,67 @@ from app.auth import (
 
 router = APIRouter()
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
-    # Check if username already exists
-    db_user = db.query(User).filter(User.username == user_data.username).first()
-    if db_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username sudah digunakan"
-        )
-    
-    # Check if email already exists
-    db_user = db.query(User).filter(User.email == user_data.email).first()
-    if db_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email sudah digunakan"
+def _check_available(user_data: UserCreate):
+    with SessionLocal() as db:
+        # Check if username already exists
+        if db.query(User.id).filter(User.username == user_data.username).first():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Username sudah digunakan"
+            )
+        
+        # Check if email already exists
+        if db.query(User.id).filter(User.email == user_data.email).first():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email sudah digunakan"
+            )
+
+def _create_user(user_data: UserCreate, hashed_password: str) -> User:
+    with SessionLocal() as db:
+        db_user = User(
+            username=user_data.username,
+            email=user_data.email,
+            full_name=user_data.full_name,
+            hashed_password=hashed_password,
+            is_admin=False
         )
-    
-    # Create new user
-    hashed_password = get_password_hash(user_data.password)
-    db_user = User(
-        username=user_data.username,
-        email=user_data.email,
-        full_name=user_data.full_name,
-        hashed_password=hashed_password,
-        is_admin=False
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+        db.add(db_user)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Registered concurrently while the password was being hashed
+            db.rollback()
+            _check_available(user_data)
+            raise
+        db.refresh(db_user)
+        return db_user
+
+@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+async def register(user_data: UserCreate):
+    # Database work runs on the threadpool and no session is held while bcrypt runs
+    await run_in_threadpool(_check_available, user_data)
+    hashed_password = await get_password_hash_async(user_data.password)
+    return await run_in_threadpool(_create_user, user_data, hashed_password)
 
 @router.post("/login", response_model=Token)
-def login(
-    form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
-):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+    user = await authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Username atau password salah",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return token_response(user)
+
+def token_response(user: User) -> dict:
+    """Issue an access token for an authenticated user"""
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
     )
     # Convert user to UserResponse schema for proper serialization
-    from app.schemas import UserResponse
     user_response = UserResponse(
         id=user.id,
         username=user.username,
@@ -77,4 +89,3 @@ def login(
         "token_type": "bearer",
         "user": user_response
     }
-
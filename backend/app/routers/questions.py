@@ -1,10 +1,15 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+import io
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, SessionLocal
 from app.models import Question, Subject
-from app.schemas import QuestionCreate, QuestionUpdate, QuestionResponse
+from app.schemas import QuestionCreate, QuestionUpdate, QuestionResponse, QuestionImportResult
+from app.question_bank import export_questions, format_from_filename, import_questions, read_records
 from app.auth import get_current_admin_user, get_current_user
+from app.question_cache import QUESTIONS_VERSION, question_cache, invalidate_questions, question_json_response, question_list_response
+from app.http_cache import Versioned
 from app.models import User
 
 router = APIRouter()
@@ -13,27 +18,76 @@ router = APIRouter()
 def get_questions(
     subject_id: int = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    validators: Dict[str, str] = Depends(Versioned(QUESTIONS_VERSION))
 ):
-    query = db.query(Question)
     if subject_id:
-        query = query.filter(Question.subject_id == subject_id)
-    questions = query.all()
-    return questions
+        return question_list_response(question_cache.get_subject(db, subject_id), validators)
+    return question_list_response(question_cache.get_all(db), validators)
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+def _stream_export(fmt: str, subject_id: Optional[int]):
+    # The request session is closed before the body is streamed
+    db = SessionLocal()
+    try:
+        for line in export_questions(db, fmt, subject_id):
+            yield line.encode("utf-8")
+    finally:
+        db.close()
+
+@router.get("/export")
+def export_question_bank(
+    format: str = Query("jsonl", pattern="^(csv|jsonl)$"),
+    subject_id: Optional[int] = None,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Stream the question bank as CSV or JSON Lines"""
+    return StreamingResponse(
+        _stream_export(format, subject_id),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="questions.{format}"'}
+    )
+
+@router.post("/import", response_model=QuestionImportResult)
+def import_question_bank(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|jsonl)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Import questions from a CSV or JSON Lines file; invalid rows are reported, not imported"""
+    fmt = format or format_from_filename(file.filename)
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Format file tidak dikenal. Gunakan csv atau jsonl."
+        )
+    
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        result = import_questions(db, read_records(stream, fmt))
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File harus menggunakan encoding UTF-8"
+        )
+    return QuestionImportResult(imported=result.imported, failed=result.failed, errors=result.errors)
 
 @router.get("/{question_id}", response_model=QuestionResponse)
 def get_question(
     question_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    validators: Dict[str, str] = Depends(Versioned(QUESTIONS_VERSION))
 ):
-    question = db.query(Question).filter(Question.id == question_id).first()
+    question = question_cache.get(db, question_id)
     if not question:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Pertanyaan tidak ditemukan"
         )
-    return question
+    return question_json_response(question, validators)
 
 @router.post("/", response_model=QuestionResponse, status_code=status.HTTP_201_CREATED)
 def create_question(
@@ -51,6 +105,7 @@ def create_question(
     
     db_question = Question(**question_data.dict())
     db.add(db_question)
+    invalidate_questions(db)
     db.commit()
     db.refresh(db_question)
     return db_question
@@ -73,6 +128,7 @@ def update_question(
     for field, value in update_data.items():
         setattr(db_question, field, value)
     
+    invalidate_questions(db)
     db.commit()
     db.refresh(db_question)
     return db_question
@@ -91,6 +147,7 @@ def delete_question(
         )
     
     db.delete(db_question)
+    invalidate_questions(db)
     db.commit()
     return None
 
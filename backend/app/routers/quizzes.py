@@ -1,18 +1,32 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
 from datetime import datetime
 import math
-from app.database import get_db
-from app.models import Question, QuizSubmission, Subject, UserLevel, Achievement, UserAchievement
+from app.database import get_db, conflict_insert
+from app.models import Question, QuizSubmission, Subject, UserLevel, SubmissionSummary
 from app.schemas import (
     QuizSubmissionCreate,
     QuizSubmissionResponse,
+    QuizBatchSubmissionCreate,
+    QuizBatchSubmissionResponse,
     QuestionResponse,
-    SubjectResponse
+    SubjectResponse,
+    QuizSessionCreate,
+    QuizSessionResponse
 )
 from app.auth import get_current_user
+from app.stats import record_submission_stats, record_submission_stats_batch
+from app.achievements import check_achievements, snapshot_metrics
+from app.question_cache import QUESTIONS_VERSION, CachedQuestion, question_cache, question_list_response
+from app.http_cache import Versioned
+from app.versions import SUBJECTS_VERSION
+from app.leaderboard import record_experience, record_subject_points
+from app.live_scores import record_score_delta
+from app.quiz_sessions import create_session, get_session
+from app.ratings import update_ratings
+from app.review import schedule_reviews
 from app.models import User
 
 router = APIRouter()
@@ -24,103 +38,140 @@ def calculate_level(total_experience: int) -> int:
         return 1
     return int(math.sqrt(total_experience / 100)) + 1
 
+def _create_user_level(db: Session, user_id: int) -> UserLevel:
+    """Create the user's level row, tolerating a concurrent request creating it first"""
+    defaults = dict(
+        user_id=user_id,
+        level=1,
+        total_experience=0,
+        current_streak=0,
+        max_streak=0,
+        total_correct=0,
+        total_questions=0
+    )
+    statement = conflict_insert(db, UserLevel)
+    if statement is None:
+        user_level = UserLevel(**defaults)
+        db.add(user_level)
+        return user_level
+    db.execute(statement.values(**defaults).on_conflict_do_nothing(index_elements=["user_id"]))
+    return db.query(UserLevel).filter(UserLevel.user_id == user_id).one()
+
 def update_user_level(db: Session, user_id: int, points_earned: int, is_correct: bool):
-    """Update user level and check for achievements"""
+    """Update user level and check for achievements (the caller commits)"""
+    return update_user_level_batch(db, user_id, [(points_earned, is_correct)])
+
+def update_user_level_batch(db: Session, user_id: int, outcomes: List[Tuple[int, bool]]):
+    """Apply ``(points_earned, is_correct)`` outcomes in order, then check achievements once"""
     user_level = db.query(UserLevel).filter(UserLevel.user_id == user_id).first()
+    # A brand-new level row starts every metric from zero
+    previous_metrics = snapshot_metrics(user_level) if user_level else {}
     
     if not user_level:
-        user_level = UserLevel(user_id=user_id, level=1, total_experience=0)
-        db.add(user_level)
-        db.flush()
+        user_level = _create_user_level(db, user_id)
     
-    # Update experience and stats
-    user_level.total_experience += points_earned
-    user_level.total_questions += 1
+    old_level = user_level.level
+    peak_streak = user_level.current_streak
     
-    if is_correct:
-        user_level.total_correct += 1
-        user_level.current_streak += 1
-        if user_level.current_streak > user_level.max_streak:
-            user_level.max_streak = user_level.current_streak
-    else:
-        user_level.current_streak = 0
+    # Update experience and stats
+    for points_earned, is_correct in outcomes:
+        user_level.total_experience += points_earned
+        user_level.total_questions += 1
+        
+        if is_correct:
+            user_level.total_correct += 1
+            user_level.current_streak += 1
+            if user_level.current_streak > user_level.max_streak:
+                user_level.max_streak = user_level.current_streak
+            peak_streak = max(peak_streak, user_level.current_streak)
+        else:
+            user_level.current_streak = 0
     
     # Calculate new level
-    old_level = user_level.level
     new_level = calculate_level(user_level.total_experience)
     level_up = new_level > old_level
     user_level.level = new_level
     user_level.updated_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(user_level)
+    record_experience(db, user_id, user_level.total_experience)
     
     # Check achievements
-    check_achievements(db, user_id, user_level)
+    check_achievements(db, user_id, user_level, previous_metrics, peaks={"streak": peak_streak})
     
     return user_level, level_up
 
-def check_achievements(db: Session, user_id: int, user_level: UserLevel):
-    """Check and unlock achievements"""
-    achievements = db.query(Achievement).all()
-    
-    for achievement in achievements:
-        # Check if user already has this achievement
-        existing = db.query(UserAchievement).filter(
-            UserAchievement.user_id == user_id,
-            UserAchievement.achievement_id == achievement.id
-        ).first()
-        
-        if existing:
-            continue
-        
-        # Check if requirement is met
-        unlocked = False
-        if achievement.requirement_type == "streak":
-            unlocked = user_level.current_streak >= achievement.requirement_value
-        elif achievement.requirement_type == "total_correct":
-            unlocked = user_level.total_correct >= achievement.requirement_value
-        elif achievement.requirement_type == "level":
-            unlocked = user_level.level >= achievement.requirement_value
-        elif achievement.requirement_type == "total_points":
-            unlocked = user_level.total_experience >= achievement.requirement_value
-        
-        if unlocked:
-            user_achievement = UserAchievement(
-                user_id=user_id,
-                achievement_id=achievement.id
+def _record_score_changes(db: Session, user_id: int, outcomes: List[Tuple[int, bool, int]]):
+    """Queue subject leaderboard and live score changes for ``(subject_id, is_correct, points_earned)`` outcomes
+
+    Both are applied only once the session commits.
+    """
+    for subject_id, is_correct, points_earned in outcomes:
+        record_subject_points(db, user_id, subject_id, points_earned)
+        record_score_delta(db, user_id, 1, 1 if is_correct else 0, points_earned)
+
+def check_answer(question: CachedQuestion, user_answer: dict) -> bool:
+    """Check if user's answer is correct using the question's compiled grader"""
+    return question.grader(user_answer)
+
+def _submission_response(
+    submission: QuizSubmission,
+    question: Optional[CachedQuestion],
+    level_up: bool = False,
+    new_level: Optional[int] = None
+) -> QuizSubmissionResponse:
+    """Build a submission response from in-session objects without re-reading them"""
+    return QuizSubmissionResponse(
+        id=submission.id,
+        question_id=submission.question_id,
+        answer=submission.answer,
+        is_correct=submission.is_correct,
+        points_earned=submission.points_earned,
+        submitted_at=submission.submitted_at,
+        question=question.data if question else None,
+        level_up=level_up,
+        new_level=new_level
+    )
+
+def _session_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Sesi kuis tidak ditemukan atau sudah berakhir"
+    )
+
+def _load_questions(
+    db: Session,
+    question_ids: set,
+    session_id: Optional[str],
+    student_id: int
+) -> Dict[int, CachedQuestion]:
+    """Questions to grade against: the session's snapshots when a session is given, else the cache"""
+    if session_id is None:
+        questions = question_cache.get_many(db, question_ids)
+        missing_ids = question_ids - questions.keys()
+        if missing_ids:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Pertanyaan tidak ditemukan" if len(question_ids) == 1
+                else f"Pertanyaan tidak ditemukan: {sorted(missing_ids)}"
             )
-            db.add(user_achievement)
+        return questions
     
-    db.commit()
-
-def check_answer(question: Question, user_answer: dict) -> bool:
-    """Check if user's answer is correct based on question type"""
-    correct_answer = question.correct_answer
-    
-    if question.question_type == "multiple_choice":
-        return user_answer.get("selected") == correct_answer.get("selected")
-    elif question.question_type == "drag_drop":
-        # For drag and drop, compare the order/positions
-        user_order = user_answer.get("order", [])
-        correct_order = correct_answer.get("order", [])
-        return user_order == correct_order
-    elif question.question_type == "fill_blank":
-        # For fill in the blank, compare the filled values
-        user_fills = user_answer.get("fills", {})
-        correct_fills = correct_answer.get("fills", {})
-        return user_fills == correct_fills
-    elif question.question_type == "true_false":
-        # For true/false, compare the boolean value
-        user_answer_value = user_answer.get("answer")
-        correct_answer_value = correct_answer.get("answer")
-        return user_answer_value == correct_answer_value
-    return False
+    session = get_session(session_id, student_id)
+    if session is None:
+        raise _session_not_found()
+    missing_ids = question_ids - session.questions.keys()
+    if missing_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Pertanyaan bukan bagian dari sesi kuis ini: {sorted(missing_ids)}"
+        )
+    return session.questions
 
 @router.get("/subjects", response_model=List[SubjectResponse])
 def get_subjects(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    validators: Dict[str, str] = Depends(Versioned(SUBJECTS_VERSION))
 ):
     subjects = db.query(Subject).all()
     return subjects
@@ -129,7 +180,8 @@ def get_subjects(
 def get_questions_by_subject(
     subject_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    validators: Dict[str, str] = Depends(Versioned(SUBJECTS_VERSION, QUESTIONS_VERSION))
 ):
     subject = db.query(Subject).filter(Subject.id == subject_id).first()
     if not subject:
@@ -138,84 +190,189 @@ def get_questions_by_subject(
             detail="Mata pelajaran tidak ditemukan"
         )
     
-    questions = db.query(Question).filter(Question.subject_id == subject_id).all()
-    return questions
+    return question_list_response(question_cache.get_subject(db, subject_id), validators)
 
-@router.post("/submit", response_model=QuizSubmissionResponse)
-def submit_answer(
-    submission_data: QuizSubmissionCreate,
+@router.post("/sessions", response_model=QuizSessionResponse, status_code=status.HTTP_201_CREATED)
+def start_quiz_session(
+    session_data: QuizSessionCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    question = db.query(Question).filter(Question.id == submission_data.question_id).first()
-    if not question:
+    """Draw questions for a quiz; the answer key stays on the server"""
+    subject = db.query(Subject).filter(Subject.id == session_data.subject_id).first()
+    if not subject:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Pertanyaan tidak ditemukan"
+            detail="Mata pelajaran tidak ditemukan"
         )
     
+    session = create_session(
+        db, current_user.id, session_data.subject_id, session_data.num_questions, session_data.mode
+    )
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Belum ada pertanyaan untuk mata pelajaran ini"
+        )
+    return Response(content=session.payload, media_type="application/json", status_code=status.HTTP_201_CREATED)
+
+@router.get("/sessions/{session_id}", response_model=QuizSessionResponse)
+def get_quiz_session(
+    session_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Resume a running quiz session"""
+    session = get_session(session_id, current_user.id)
+    if session is None:
+        raise _session_not_found()
+    return Response(content=session.payload, media_type="application/json")
+
+@router.post("/submit", response_model=QuizSubmissionResponse)
+def submit_answer(
+    submission_data: QuizSubmissionCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    question = _load_questions(
+        db, {submission_data.question_id}, submission_data.session_id, current_user.id
+    )[submission_data.question_id]
+    
     is_correct = check_answer(question, submission_data.answer)
     points_earned = question.points if is_correct else 0
     
+    # Submission, stats, level and achievements are written in one transaction.
+    # The timestamp is set client-side so the row never has to be re-read.
     submission = QuizSubmission(
         student_id=current_user.id,
         question_id=submission_data.question_id,
         answer=submission_data.answer,
         is_correct=is_correct,
-        points_earned=points_earned
+        points_earned=points_earned,
+        submitted_at=datetime.utcnow()
     )
     db.add(submission)
-    db.commit()
-    db.refresh(submission)
+    record_submission_stats(db, current_user.id, question.subject_id, is_correct, points_earned)
+    _record_score_changes(db, current_user.id, [(question.subject_id, is_correct, points_earned)])
+    update_ratings(db, current_user.id, [(question, is_correct)])
+    schedule_reviews(db, current_user.id, [(question.id, is_correct)], submission.submitted_at)
     
     # Update user level and check achievements
     user_level_obj, level_up = update_user_level(db, current_user.id, points_earned, is_correct)
+    db.flush()
+    
+    # Build the response before committing; committing expires the ORM state
+    response = _submission_response(
+        submission,
+        question,
+        level_up=level_up,
+        new_level=user_level_obj.level if level_up else None
+    )
+    db.commit()
+    
+    return response
+
+@router.post("/submit/batch", response_model=QuizBatchSubmissionResponse)
+def submit_answers_batch(
+    batch_data: QuizBatchSubmissionCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Grade and store a whole quiz attempt in one transaction"""
+    question_ids = {answer.question_id for answer in batch_data.answers}
+    questions = _load_questions(db, question_ids, batch_data.session_id, current_user.id)
+    
+    submitted_at = datetime.utcnow()
+    submissions = []
+    for answer in batch_data.answers:
+        question = questions[answer.question_id]
+        is_correct = check_answer(question, answer.answer)
+        submissions.append(QuizSubmission(
+            student_id=current_user.id,
+            question_id=answer.question_id,
+            answer=answer.answer,
+            is_correct=is_correct,
+            points_earned=question.points if is_correct else 0,
+            submitted_at=submitted_at
+        ))
+    db.add_all(submissions)
     
-    # Attach question to submission for response
-    submission.question = question
-    
-    # Create response dict with level info
-    response_dict = {
-        "id": submission.id,
-        "question_id": submission.question_id,
-        "answer": submission.answer,
-        "is_correct": submission.is_correct,
-        "points_earned": submission.points_earned,
-        "submitted_at": submission.submitted_at,
-        "question": QuestionResponse(
-            id=question.id,
-            subject_id=question.subject_id,
-            question_type=question.question_type,
-            question_text=question.question_text,
-            options=question.options,
-            correct_answer=question.correct_answer,
-            explanation=question.explanation,
-            points=question.points,
-            created_at=question.created_at,
-            updated_at=question.updated_at
-        ),
-        "level_up": level_up,
-        "new_level": user_level_obj.level if level_up else None
-    }
-    
-    return QuizSubmissionResponse(**response_dict)
+    outcomes = [(questions[s.question_id].subject_id, s.is_correct, s.points_earned) for s in submissions]
+    record_submission_stats_batch(db, current_user.id, outcomes)
+    _record_score_changes(db, current_user.id, outcomes)
+    update_ratings(db, current_user.id, [(questions[s.question_id], s.is_correct) for s in submissions])
+    schedule_reviews(db, current_user.id, [(s.question_id, s.is_correct) for s in submissions], submitted_at)
+    user_level_obj, level_up = update_user_level_batch(db, current_user.id, [
+        (s.points_earned, s.is_correct) for s in submissions
+    ])
+    db.flush()
+    
+    response = QuizBatchSubmissionResponse(
+        submissions=[_submission_response(s, questions[s.question_id]) for s in submissions],
+        total_correct=sum(1 for s in submissions if s.is_correct),
+        total_points=sum(s.points_earned for s in submissions),
+        level_up=level_up,
+        new_level=user_level_obj.level if level_up else None
+    )
+    db.commit()
+    
+    return response
 
 @router.get("/submissions", response_model=List[QuizSubmissionResponse])
 def get_my_submissions(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after: Optional[int] = None,
+    subject_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_question: bool = True,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    submissions = db.query(QuizSubmission).filter(
+    """The student's submissions in submission order.
+
+    Pass ``limit`` to paginate; the id to pass as ``after`` for the next page
+    is returned in the ``X-Next-Cursor`` header. ``include_question=false``
+    omits the embedded question to shrink the payload.
+    """
+    query = db.query(QuizSubmission).filter(
         QuizSubmission.student_id == current_user.id
-    ).all()
+    )
+    if after is not None:
+        query = query.filter(QuizSubmission.id > after)
+    if subject_id is not None:
+        query = query.filter(QuizSubmission.question_id.in_(
+            select(Question.id).where(Question.subject_id == subject_id)
+        ))
+    if since is not None:
+        query = query.filter(QuizSubmission.submitted_at >= since)
+    if until is not None:
+        query = query.filter(QuizSubmission.submitted_at < until)
+    query = query.order_by(QuizSubmission.id)
+    if limit is not None:
+        query = query.limit(limit)
+    submissions = query.all()
     
-    # Attach question details
-    for submission in submissions:
-        submission.question = db.query(Question).filter(
-            Question.id == submission.question_id
-        ).first()
+    if limit is not None and len(submissions) == limit:
+        response.headers["X-Next-Cursor"] = str(submissions[-1].id)
     
-    return submissions
+    # Attach question details with one lookup for all distinct questions
+    questions = {}
+    if include_question:
+        questions = question_cache.get_many(db, {s.question_id for s in submissions})
+    
+    return [
+        QuizSubmissionResponse(
+            id=submission.id,
+            question_id=submission.question_id,
+            answer=submission.answer,
+            is_correct=submission.is_correct,
+            points_earned=submission.points_earned,
+            submitted_at=submission.submitted_at,
+            question=questions[submission.question_id].data if submission.question_id in questions else None
+        )
+        for submission in submissions
+    ]
 
 @router.get("/submissions/{question_id}", response_model=QuizSubmissionResponse)
 def get_submission_for_question(
@@ -223,20 +380,33 @@ def get_submission_for_question(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    """The student's latest answer to a question, including archived history"""
+    question = question_cache.get(db, question_id)
     submission = db.query(QuizSubmission).filter(
         QuizSubmission.student_id == current_user.id,
         QuizSubmission.question_id == question_id
-    ).first()
+    ).order_by(QuizSubmission.id.desc()).first()
     
-    if not submission:
+    if submission:
+        return _submission_response(submission, question)
+    
+    # Older attempts may have been rolled up by the archival job
+    summary = db.query(SubmissionSummary).filter(
+        SubmissionSummary.student_id == current_user.id,
+        SubmissionSummary.question_id == question_id
+    ).first()
+    if not summary:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Jawaban tidak ditemukan"
         )
     
-    submission.question = db.query(Question).filter(
-        Question.id == question_id
-    ).first()
-    
-    return submission
-
+    return QuizSubmissionResponse(
+        id=summary.last_submission_id,
+        question_id=summary.question_id,
+        answer=summary.last_answer,
+        is_correct=summary.last_is_correct,
+        points_earned=summary.last_points_earned,
+        submitted_at=summary.last_submitted_at,
+        question=question.data if question else None
+    )
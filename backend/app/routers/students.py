@@ -1,12 +1,18 @@
-from typing import List
-from fastapi import APIRouter, Depends
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 import math
+from datetime import datetime
 from app.database import get_db
-from app.models import QuizSubmission, Question, Subject, UserLevel, Achievement, UserAchievement
-from app.schemas import StudentProgress, FeedbackResponse, UserLevelResponse, UserAchievementResponse, AchievementResponse
+from app.models import Subject, UserLevel, Achievement, UserAchievement, StudentSubjectStats
+from app.schemas import StudentProgress, FeedbackResponse, UserLevelResponse, UserAchievementResponse, AchievementResponse, LeaderboardEntry, LeaderboardResponse, ReviewItem
+from app.leaderboard import leaderboard
+from app.question_cache import question_cache
+from app.quiz_sessions import quiz_question
+from app.review import due_reviews
 from app.auth import get_current_user
+from app.http_cache import Versioned
+from app.versions import ACHIEVEMENTS_VERSION
 from app.models import User, Feedback
 
 router = APIRouter()
@@ -16,30 +22,26 @@ def get_my_progress(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Get all submissions
-    submissions = db.query(QuizSubmission).filter(
-        QuizSubmission.student_id == current_user.id
+    # Totals come from the materialized per-subject stats, one row per subject
+    subject_rows = db.query(StudentSubjectStats).filter(
+        StudentSubjectStats.student_id == current_user.id
     ).all()
     
-    total_questions = len(submissions)
-    total_correct = sum(1 for s in submissions if s.is_correct)
-    total_points = sum(s.points_earned for s in submissions)
+    stats_by_subject = {row.subject_id: row for row in subject_rows}
+    total_questions = sum(row.attempts for row in subject_rows)
+    total_correct = sum(row.correct for row in subject_rows)
+    total_points = sum(row.points for row in subject_rows)
     accuracy = (total_correct / total_questions * 100) if total_questions > 0 else 0
     
     # Get progress by subject
     subject_progress = []
-    subjects = db.query(Subject).all()
+    subjects = db.query(Subject.id, Subject.name).all()
     
     for subject in subjects:
-        subject_questions = db.query(Question).filter(
-            Question.subject_id == subject.id
-        ).all()
-        question_ids = [q.id for q in subject_questions]
-        
-        subject_submissions = [s for s in submissions if s.question_id in question_ids]
-        subject_total = len(subject_submissions)
-        subject_correct = sum(1 for s in subject_submissions if s.is_correct)
-        subject_points = sum(s.points_earned for s in subject_submissions)
+        stats = stats_by_subject.get(subject.id)
+        subject_total = stats.attempts if stats else 0
+        subject_correct = stats.correct if stats else 0
+        subject_points = stats.points if stats else 0
         subject_accuracy = (subject_correct / subject_total * 100) if subject_total > 0 else 0
         
         subject_progress.append({
@@ -59,6 +61,53 @@ def get_my_progress(
         subjects=subject_progress
     )
 
+@router.get("/leaderboard", response_model=LeaderboardResponse)
+def get_leaderboard(
+    subject_id: Optional[int] = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Top students by experience (or by points in one subject) and the caller's rank"""
+    top, my_rank, my_score, total_students = leaderboard.standings(subject_id, current_user.id, limit)
+    
+    names = dict(db.query(User.id, User.full_name).filter(
+        User.id.in_([user_id for _, user_id, _ in top])
+    ).all()) if top else {}
+    
+    return LeaderboardResponse(
+        subject_id=subject_id,
+        entries=[
+            LeaderboardEntry(rank=rank, student_id=user_id, student_name=names.get(user_id, ""), score=score)
+            for rank, user_id, score in top
+        ],
+        my_rank=my_rank,
+        my_score=my_score or 0,
+        total_students=total_students
+    )
+
+@router.get("/review", response_model=List[ReviewItem])
+def get_review_queue(
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Questions due for spaced-repetition review, most overdue first"""
+    schedules = due_reviews(db, current_user.id, limit, datetime.utcnow())
+    questions = question_cache.get_many(db, {schedule.question_id for schedule in schedules})
+    return [
+        ReviewItem(
+            question=quiz_question(questions[schedule.question_id]),
+            due_at=schedule.due_at,
+            last_reviewed_at=schedule.last_reviewed_at,
+            repetitions=schedule.repetitions,
+            interval_days=schedule.interval_days,
+            ease_factor=schedule.ease_factor
+        )
+        for schedule in schedules
+        if schedule.question_id in questions
+    ]
+
 @router.get("/feedback", response_model=List[FeedbackResponse])
 def get_my_feedback(
     db: Session = Depends(get_db),
@@ -135,15 +184,11 @@ def get_my_achievements(
 @router.get("/achievements/available", response_model=List[AchievementResponse])
 def get_available_achievements(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    validators: Dict[str, str] = Depends(Versioned(ACHIEVEMENTS_VERSION))
 ):
     """Get all achievements, including locked and unlocked ones"""
     all_achievements = db.query(Achievement).all()
-    unlocked_achievement_ids = [
-        ua.achievement_id for ua in db.query(UserAchievement).filter(
-            UserAchievement.user_id == current_user.id
-        ).all()
-    ]
     
     result = []
     for achievement in all_achievements:
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, EmailStr, Field
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 
 # User Schemas
@@ -58,6 +58,36 @@ class QuestionResponse(QuestionBase):
     class Config:
         from_attributes = True
 
+class QuestionImportError(BaseModel):
+    row: int
+    error: str
+
+class QuestionImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[QuestionImportError]
+
+class WrongAnswerCount(BaseModel):
+    answer: Any
+    count: int
+
+class QuestionStats(BaseModel):
+    question_id: int
+    subject_id: int
+    question_type: str
+    question_text: str
+    attempts: int
+    correct_attempts: int
+    students: int
+    p_value: Optional[float] = None
+    point_biserial: Optional[float] = None
+    flags: List[str] = []
+    common_wrong_answers: Optional[List[WrongAnswerCount]] = None
+
+class SubjectQuestionReport(BaseModel):
+    subject_id: int
+    questions: List[QuestionStats]
+
 # Subject Schemas
 class SubjectBase(BaseModel):
     name: str
@@ -78,10 +108,13 @@ class SubjectResponse(SubjectBase):
         from_attributes = True
 
 # Quiz Submission Schemas
-class QuizSubmissionCreate(BaseModel):
+class QuizAnswer(BaseModel):
     question_id: int
     answer: Dict[str, Any]
 
+class QuizSubmissionCreate(QuizAnswer):
+    session_id: Optional[str] = None
+
 class QuizSubmissionResponse(BaseModel):
     id: int
     question_id: int
@@ -89,13 +122,53 @@ class QuizSubmissionResponse(BaseModel):
     is_correct: bool
     points_earned: int
     submitted_at: datetime
-    question: QuestionResponse
+    question: Optional[QuestionResponse] = None
     level_up: Optional[bool] = False
     new_level: Optional[int] = None
     
     class Config:
         from_attributes = True
 
+class QuizBatchSubmissionCreate(BaseModel):
+    answers: List[QuizAnswer] = Field(..., min_length=1, max_length=200)
+    session_id: Optional[str] = None
+
+class QuizSessionCreate(BaseModel):
+    subject_id: int
+    num_questions: int = Field(10, ge=1, le=200)
+    mode: Literal["random", "adaptive"] = "random"
+
+class QuizQuestion(BaseModel):
+    """A question as shown during a quiz, without the answer key"""
+    id: int
+    subject_id: int
+    question_type: str
+    question_text: str
+    options: Optional[List[str]] = None
+    points: int
+
+class ReviewItem(BaseModel):
+    question: QuizQuestion
+    due_at: datetime
+    last_reviewed_at: datetime
+    repetitions: int
+    interval_days: float
+    ease_factor: float
+
+class QuizSessionResponse(BaseModel):
+    session_id: str
+    subject_id: int
+    mode: str
+    expires_at: datetime
+    questions: List[QuizQuestion]
+
+class QuizBatchSubmissionResponse(BaseModel):
+    submissions: List[QuizSubmissionResponse]
+    total_correct: int
+    total_points: int
+    level_up: bool = False
+    new_level: Optional[int] = None
+
 # Feedback Schemas
 class FeedbackCreate(BaseModel):
     student_id: int
@@ -168,3 +241,17 @@ class AchievementCreate(BaseModel):
     requirement_type: str
     requirement_value: int
 
+
+# Leaderboard Schemas
+class LeaderboardEntry(BaseModel):
+    rank: int
+    student_id: int
+    student_name: str
+    score: int
+
+class LeaderboardResponse(BaseModel):
+    subject_id: Optional[int] = None
+    entries: List[LeaderboardEntry]
+    my_rank: Optional[int] = None
+    my_score: int = 0
+    total_students: int
@@ -0,0 +1,125 @@
+"""
+Materialized per-student, per-subject totals.
+
+``student_subject_stats`` mirrors the aggregates of ``quiz_submissions`` so the
+progress and score endpoints read one row per subject instead of scanning the
+whole submission log. Rows are updated incrementally on every submission and
+can be recomputed from history with ``rebuild_student_subject_stats``.
+"""
+from typing import Dict, List, Tuple
+from sqlalchemy import case, delete, func, insert, literal, select, union_all
+from sqlalchemy.orm import Session
+from app.database import conflict_insert
+from app.models import Question, QuizSubmission, StudentSubjectStats, SubmissionSummary
+
+def record_submission_stats(db: Session, student_id: int, subject_id: int, is_correct: bool, points_earned: int):
+    """Add one submission to the student's totals for a subject (no commit)"""
+    _add_to_stats(db, student_id, {subject_id: (1, 1 if is_correct else 0, points_earned)})
+
+def record_submission_stats_batch(db: Session, student_id: int, outcomes: List[Tuple[int, bool, int]]):
+    """Add several ``(subject_id, is_correct, points_earned)`` outcomes at once (no commit)"""
+    totals: Dict[int, Tuple[int, int, int]] = {}
+    for subject_id, is_correct, points_earned in outcomes:
+        attempts, correct, points = totals.get(subject_id, (0, 0, 0))
+        totals[subject_id] = (attempts + 1, correct + (1 if is_correct else 0), points + points_earned)
+    _add_to_stats(db, student_id, totals)
+
+def _add_to_stats(db: Session, student_id: int, totals: Dict[int, Tuple[int, int, int]]):
+    """Increment ``{subject_id: (attempts, correct, points)}`` for a student
+
+    Uses a single atomic upsert where the backend supports it, so concurrent
+    submissions neither lose increments nor race on creating the row.
+    """
+    statement = conflict_insert(db, StudentSubjectStats)
+    if statement is not None:
+        statement = statement.values([
+            {
+                "student_id": student_id,
+                "subject_id": subject_id,
+                "attempts": attempts,
+                "correct": correct,
+                "points": points,
+            }
+            for subject_id, (attempts, correct, points) in totals.items()
+        ])
+        db.execute(statement.on_conflict_do_update(
+            index_elements=["student_id", "subject_id"],
+            set_={
+                "attempts": StudentSubjectStats.attempts + statement.excluded.attempts,
+                "correct": StudentSubjectStats.correct + statement.excluded.correct,
+                "points": StudentSubjectStats.points + statement.excluded.points,
+                "updated_at": func.now(),
+            }
+        ))
+        return
+    
+    existing = {
+        stats.subject_id: stats for stats in db.query(StudentSubjectStats).filter(
+            StudentSubjectStats.student_id == student_id,
+            StudentSubjectStats.subject_id.in_(list(totals))
+        )
+    }
+    for subject_id, (attempts, correct, points) in totals.items():
+        stats = existing.get(subject_id)
+        if not stats:
+            stats = StudentSubjectStats(
+                student_id=student_id,
+                subject_id=subject_id,
+                attempts=0,
+                correct=0,
+                points=0
+            )
+            db.add(stats)
+        stats.attempts += attempts
+        stats.correct += correct
+        stats.points += points
+
+def rebuild_student_subject_stats(db: Session) -> int:
+    """Recompute every stats row from the submission history and commit
+
+    History is the live ``quiz_submissions`` rows plus the roll-ups of rows
+    that were moved to the archive.
+    """
+    history = union_all(
+        select(
+            QuizSubmission.student_id.label("student_id"),
+            QuizSubmission.question_id.label("question_id"),
+            literal(1).label("attempts"),
+            case((QuizSubmission.is_correct == True, 1), else_=0).label("correct"),
+            func.coalesce(QuizSubmission.points_earned, 0).label("points")
+        ),
+        select(
+            SubmissionSummary.student_id,
+            SubmissionSummary.question_id,
+            SubmissionSummary.attempts,
+            SubmissionSummary.correct_attempts,
+            SubmissionSummary.points_earned
+        )
+    ).subquery()
+    
+    aggregated = select(
+        history.c.student_id,
+        Question.subject_id,
+        func.sum(history.c.attempts),
+        func.sum(history.c.correct),
+        func.sum(history.c.points)
+    ).join(
+        Question, Question.id == history.c.question_id
+    ).group_by(history.c.student_id, Question.subject_id)
+    
+    db.execute(delete(StudentSubjectStats))
+    db.execute(insert(StudentSubjectStats).from_select(
+        ["student_id", "subject_id", "attempts", "correct", "points"],
+        aggregated
+    ))
+    db.commit()
+    return db.query(StudentSubjectStats).count()
+
+def backfill_student_subject_stats(db: Session) -> bool:
+    """Rebuild the stats table if it is empty but submissions already exist"""
+    if db.query(StudentSubjectStats.id).first() is not None:
+        return False
+    if db.query(QuizSubmission.id).first() is None:
+        return False
+    rebuild_student_subject_stats(db)
+    return True
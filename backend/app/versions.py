@@ -0,0 +1,33 @@
+"""
+Shared version counters for process-local caches.
+
+Writers call ``bump_version`` inside their transaction; every worker compares
+the stored counter with the one its cache was built from to detect staleness.
+"""
+from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.models import CacheVersion
+
+SUBJECTS_VERSION = "subjects"
+ACHIEVEMENTS_VERSION = "achievements"
+
+def get_version(db: Session, name: str) -> int:
+    """Current version of a named counter (0 if it was never bumped)"""
+    version = db.execute(
+        select(CacheVersion.version).where(CacheVersion.name == name)
+    ).scalar()
+    return version or 0
+
+def bump_version(db: Session, name: str):
+    """Increment a named counter as part of the caller's transaction (no commit)"""
+    now = datetime.utcnow()
+    result = db.execute(
+        update(CacheVersion).where(CacheVersion.name == name).values(
+            version=CacheVersion.version + 1,
+            updated_at=now
+        )
+    )
+    if result.rowcount == 0:
+        db.add(CacheVersion(name=name, version=1, updated_at=now))
+        db.flush()
@@ -0,0 +1,36 @@
+"""
+Script untuk mengarsipkan jawaban kuis lama ke file terkompresi
+"""
+import argparse
+from datetime import datetime, timedelta
+from app.database import SessionLocal, engine, Base
+from app.archive import archive_submissions
+
+# Create all tables
+Base.metadata.create_all(bind=engine)
+
+def main():
+    parser = argparse.ArgumentParser(description="Arsipkan quiz_submissions yang lebih lama dari N hari")
+    parser.add_argument("--days", type=int, default=180, help="Umur minimal jawaban yang diarsipkan (hari)")
+    parser.add_argument("--archive-dir", default="archive", help="Direktori file arsip .jsonl.gz")
+    args = parser.parse_args()
+    
+    cutoff = datetime.utcnow() - timedelta(days=args.days)
+    db = SessionLocal()
+    
+    try:
+        archived, path = archive_submissions(db, cutoff, args.archive_dir)
+        if archived:
+            print(f"✓ {archived} jawaban diarsipkan ke {path}")
+        else:
+            print("✓ Tidak ada jawaban yang perlu diarsipkan")
+    except Exception as e:
+        db.rollback()
+        print(f"✗ Error archiving submissions: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
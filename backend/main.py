@@ -1,12 +1,35 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import auth, questions, quizzes, admin, students
-from app.database import engine, Base
+from app.config import settings
+from app.database import engine, Base, SessionLocal
+from app.stats import backfill_student_subject_stats
+from app.migrations import upgrade_schema
+from app.leaderboard import leaderboard
+from app.ratings import flush_question_ratings, flush_question_ratings_periodically, question_pool
 
-# Create database tables
+# Create database tables and add indexes missing from older databases
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
 
-app = FastAPI(title="Platform Kuis Edukatif", version="1.0.0")
+# Populate materialized stats for databases that predate the stats table,
+# then load the in-memory leaderboards and question difficulty pools
+with SessionLocal() as db:
+    backfill_student_subject_stats(db)
+    leaderboard.rebuild(db)
+    question_pool.rebuild(db)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Question difficulty changes are batched in memory and written periodically
+    flusher = asyncio.create_task(flush_question_ratings_periodically())
+    yield
+    flusher.cancel()
+    flush_question_ratings()
+
+app = FastAPI(title="Platform Kuis Edukatif", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -17,7 +40,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include routers
+# Include routers; async variants of the hot endpoints are registered first
+# so they take precedence over the sync handlers on the same paths
+if settings.use_async_db:
+    from app.routers import async_endpoints
+    app.include_router(async_endpoints.router, prefix="/api", tags=["async"])
+
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
 app.include_router(questions.router, prefix="/api/questions", tags=["questions"])
 app.include_router(quizzes.router, prefix="/api/quizzes", tags=["quizzes"])
@@ -0,0 +1,51 @@
+"""
+Script untuk impor dan ekspor bank soal (CSV atau JSON Lines)
+"""
+import argparse
+import sys
+from contextlib import nullcontext
+from app.database import SessionLocal, engine, Base
+from app.question_bank import export_questions, format_from_filename, import_questions, read_records
+
+# Create all tables
+Base.metadata.create_all(bind=engine)
+
+def main():
+    parser = argparse.ArgumentParser(description="Impor atau ekspor bank soal")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("path", help="File sumber (impor) atau tujuan (ekspor); '-' untuk stdin/stdout")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Default: dari ekstensi file, atau jsonl")
+    parser.add_argument("--subject-id", type=int, help="Ekspor hanya satu mata pelajaran")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Jumlah baris per transaksi impor")
+    args = parser.parse_args()
+    
+    fmt = args.format or format_from_filename(args.path) or "jsonl"
+    db = SessionLocal()
+    
+    try:
+        if args.action == "import":
+            source = nullcontext(sys.stdin) if args.path == "-" else open(args.path, encoding="utf-8-sig", newline="")
+            with source as stream:
+                result = import_questions(db, read_records(stream, fmt), chunk_size=args.chunk_size)
+            print(f"✓ {result.imported} pertanyaan diimpor", file=sys.stderr)
+            if result.failed:
+                print(f"✗ {result.failed} baris gagal:", file=sys.stderr)
+                for error in result.errors:
+                    print(f"  baris {error['row']}: {error['error']}", file=sys.stderr)
+        else:
+            target = nullcontext(sys.stdout) if args.path == "-" else open(args.path, "w", encoding="utf-8", newline="")
+            with target as stream:
+                for line in export_questions(db, fmt, args.subject_id):
+                    stream.write(line)
+            if args.path != "-":
+                print(f"✓ Bank soal diekspor ke {args.path}", file=sys.stderr)
+    except Exception as e:
+        db.rollback()
+        print(f"✗ Error: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
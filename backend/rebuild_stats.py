@@ -0,0 +1,25 @@
+"""
+Script untuk menghitung ulang tabel student_subject_stats dari riwayat jawaban
+"""
+from app.database import SessionLocal, engine, Base
+from app.stats import rebuild_student_subject_stats
+
+# Create all tables
+Base.metadata.create_all(bind=engine)
+
+def rebuild_stats():
+    db = SessionLocal()
+    
+    try:
+        row_count = rebuild_student_subject_stats(db)
+        print(f"✓ Statistik siswa dihitung ulang ({row_count} baris)")
+    except Exception as e:
+        db.rollback()
+        print(f"✗ Error rebuilding stats: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild_stats()
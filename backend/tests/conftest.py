@@ -0,0 +1,63 @@
+"""
+Shared fixtures: the app on a private in-memory SQLite database, seeded with
+an admin, a student, a subject with questions and a few graded answers.
+"""
+import os
+
+# Must be set before the app reads its settings
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["USE_ASYNC_DB"] = "false"
+os.environ["BCRYPT_ROUNDS"] = "4"
+
+import pytest
+from fastapi.testclient import TestClient
+from app.auth import get_password_hash
+from app.database import SessionLocal
+from app.models import Achievement, Question, Subject, User
+from app.versions import ACHIEVEMENTS_VERSION, bump_version
+from main import app
+
+def _login(client: TestClient, username: str, password: str) -> dict:
+    response = client.post("/api/auth/login", data={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture(scope="session")
+def client() -> TestClient:
+    return TestClient(app)
+
+@pytest.fixture(scope="session")
+def seed(client):
+    with SessionLocal() as db:
+        db.add_all([
+            User(username="admin", email="admin@example.com", full_name="Administrator",
+                 hashed_password=get_password_hash("admin123"), is_admin=True),
+            User(username="siswa1", email="siswa1@example.com", full_name="Siswa Contoh",
+                 hashed_password=get_password_hash("siswa123"), is_admin=False),
+        ])
+        subject = Subject(name="Matematika", description="Matematika dasar")
+        db.add(subject)
+        db.flush()
+        questions = [
+            Question(subject_id=subject.id, question_type="multiple_choice", question_text=f"{n} + 1 = ?",
+                     options=[str(n), str(n + 1), str(n + 2)], correct_answer={"selected": 1}, points=10)
+            for n in range(5)
+        ]
+        db.add_all(questions)
+        db.add(Achievement(name="Jawaban Pertama", description="Jawab satu soal dengan benar", icon="⭐",
+                           requirement_type="total_correct", requirement_value=1))
+        bump_version(db, ACHIEVEMENTS_VERSION)
+        db.commit()
+        student_id = db.query(User.id).filter(User.username == "siswa1").scalar()
+        data = {"subject_id": subject.id, "question_ids": [question.id for question in questions], "student_id": student_id}
+
+    admin = _login(client, "admin", "admin123")
+    student = _login(client, "siswa1", "siswa123")
+    for index, question_id in enumerate(data["question_ids"]):
+        response = client.post(
+            "/api/quizzes/submit",
+            json={"question_id": question_id, "answer": {"selected": 1 if index % 2 == 0 else 0}},
+            headers=student
+        )
+        assert response.status_code == 200, response.text
+    return {**data, "admin": admin, "student": student}
@@ -0,0 +1,121 @@
+"""
+Archiving old submissions must not change anything a student or admin sees.
+
+The student answers some questions more than once, the answers are backdated
+and archived, and every read that now depends on ``submission_summaries``
+has to return what it returned from the raw rows.
+"""
+import gzip
+import json
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import update
+from app.archive import archive_submissions
+from app.auth import get_password_hash
+from app.database import SessionLocal
+from app.models import QuizSubmission, StudentSubjectStats, SubmissionSummary, User
+from app.stats import rebuild_student_subject_stats
+
+# (question index, selected option); option 1 is correct
+ANSWERS = [(0, 0), (0, 1), (1, 1), (1, 1), (2, 0), (3, 1), (3, 0), (3, 2)]
+
+@pytest.fixture(scope="module")
+def archived_student(client, seed):
+    with SessionLocal() as db:
+        student = User(username="siswa_arsip", email="siswa_arsip@example.com", full_name="Siswa Arsip",
+                       hashed_password=get_password_hash("arsip123"), is_admin=False)
+        db.add(student)
+        db.commit()
+        student_id = student.id
+
+    response = client.post("/api/auth/login", data={"username": "siswa_arsip", "password": "arsip123"})
+    assert response.status_code == 200, response.text
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    for index, selected in ANSWERS:
+        response = client.post(
+            "/api/quizzes/submit",
+            json={"question_id": seed["question_ids"][index], "answer": {"selected": selected}},
+            headers=headers
+        )
+        assert response.status_code == 200, response.text
+
+    # Only this student's answers are old enough to be archived
+    old = datetime(2000, 1, 1)
+    with SessionLocal() as db:
+        submission_ids = [
+            submission_id for (submission_id,) in db.query(QuizSubmission.id).filter(
+                QuizSubmission.student_id == student_id
+            ).order_by(QuizSubmission.id)
+        ]
+        for offset, submission_id in enumerate(submission_ids):
+            db.execute(update(QuizSubmission).where(QuizSubmission.id == submission_id).values(
+                submitted_at=old + timedelta(minutes=offset)
+            ))
+        db.commit()
+    return {"id": student_id, "headers": headers, "cutoff": datetime(2001, 1, 1)}
+
+def student_reads(client, seed, student) -> dict:
+    submissions = {}
+    for question_id in seed["question_ids"]:
+        response = client.get(f"/api/quizzes/submissions/{question_id}", headers=student["headers"])
+        submissions[question_id] = (response.status_code, response.json())
+    progress = client.get("/api/students/progress", headers=student["headers"])
+    assert progress.status_code == 200, progress.text
+    return {"progress": progress.json(), "submissions": submissions}
+
+def stats_rows(db) -> set:
+    return {
+        (row.student_id, row.subject_id, row.attempts, row.correct, row.points)
+        for row in db.query(StudentSubjectStats)
+    }
+
+def raw_rows(db, student_id: int) -> list:
+    return [
+        {
+            "id": row.id,
+            "student_id": row.student_id,
+            "question_id": row.question_id,
+            "answer": row.answer,
+            "is_correct": row.is_correct,
+            "points_earned": row.points_earned,
+            "submitted_at": row.submitted_at.isoformat(),
+        }
+        for row in db.query(QuizSubmission).filter(
+            QuizSubmission.student_id == student_id
+        ).order_by(QuizSubmission.id)
+    ]
+
+def test_archiving_keeps_reads_and_stats_unchanged(client, seed, archived_student, tmp_path):
+    before = student_reads(client, seed, archived_student)
+    with SessionLocal() as db:
+        incremental_stats = stats_rows(db)
+        rows = raw_rows(db, archived_student["id"])
+        assert len(rows) == len(ANSWERS)
+        rebuild_student_subject_stats(db)
+        assert stats_rows(db) == incremental_stats
+
+        # Small chunks so one student's repeated answers span several commits
+        archived, path = archive_submissions(db, archived_student["cutoff"], str(tmp_path), chunk_size=3)
+
+        assert archived == len(ANSWERS)
+        assert raw_rows(db, archived_student["id"]) == []
+        assert db.query(QuizSubmission).filter(
+            QuizSubmission.student_id == seed["student_id"]
+        ).count() == len(seed["question_ids"])
+        assert db.query(SubmissionSummary).filter(
+            SubmissionSummary.student_id == archived_student["id"]
+        ).count() == len({index for index, _ in ANSWERS})
+
+    with gzip.open(path, "rt", encoding="utf-8") as archive_file:
+        assert [json.loads(line) for line in archive_file] == rows
+
+    assert student_reads(client, seed, archived_student) == before
+
+    with SessionLocal() as db:
+        rebuild_student_subject_stats(db)
+        assert stats_rows(db) == incremental_stats
+
+def test_archiving_without_old_rows_writes_no_file(seed, tmp_path):
+    with SessionLocal() as db:
+        assert archive_submissions(db, datetime(1990, 1, 1), str(tmp_path)) == (0, None)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,100 @@
+"""
+Grading rules of every question type.
+"""
+import pytest
+from app.graders import GRADERS, Grader, compile_grader, normalize_text
+
+@pytest.mark.parametrize("value, expected", [
+    ("Jakarta", "jakarta"),
+    ("  Ibu   Kota \t Negara\n", "ibu kota negara"),
+    ("STRASSE", "strasse"),
+    ("Straße", "strasse"),
+    (42, "42"),
+])
+def test_normalize_text(value, expected):
+    assert normalize_text(value) == expected
+
+@pytest.mark.parametrize("answer, correct", [
+    ({"selected": 2}, True),
+    ({"selected": 1}, False),
+    ({"selected": "2"}, False),
+    ({"selected": None}, False),
+    ({}, False),
+])
+def test_multiple_choice(answer, correct):
+    assert compile_grader("multiple_choice", {"selected": 2})(answer) is correct
+
+@pytest.mark.parametrize("answer, correct", [
+    ({"order": [2, 0, 1]}, True),
+    ({"order": (2, 0, 1)}, True),
+    ({"order": [0, 1, 2]}, False),
+    ({"order": [2, 0]}, False),
+    ({"order": [2, 0, 1, 3]}, False),
+    # Anything other than a list is rejected, even if it iterates to the same items
+    ({"order": "201"}, False),
+    ({"order": {2: 0, 0: 1, 1: 2}}, False),
+    ({"order": 201}, False),
+    ({"order": None}, False),
+    ({}, False),
+])
+def test_drag_drop(answer, correct):
+    assert compile_grader("drag_drop", {"order": [2, 0, 1]})(answer) is correct
+
+def test_drag_drop_without_expected_order_accepts_only_empty_order():
+    grader = compile_grader("drag_drop", {})
+    assert grader({"order": []}) is True
+    assert grader({}) is True
+    assert grader({"order": [0]}) is False
+
+@pytest.mark.parametrize("answer, correct", [
+    ({"fills": {"1": "Jakarta", "2": "Bandung"}}, True),
+    ({"fills": {"1": "jakarta", "2": "BANDUNG"}}, True),
+    ({"fills": {"1": "  Jakarta ", "2": "Bandung\n"}}, True),
+    ({"fills": {"1": "Kota  Jakarta", "2": "Bandung"}}, False),
+    ({"fills": {"1": "Jakarta", "2": "Surabaya"}}, False),
+    # Missing or extra blanks are wrong
+    ({"fills": {"1": "Jakarta"}}, False),
+    ({"fills": {"1": "Jakarta", "2": "Bandung", "3": "Medan"}}, False),
+    ({"fills": ["Jakarta", "Bandung"]}, False),
+    ({"fills": None}, False),
+    ({}, False),
+])
+def test_fill_blank(answer, correct):
+    assert compile_grader("fill_blank", {"fills": {"1": "Jakarta", "2": "Bandung"}})(answer) is correct
+
+def test_fill_blank_normalizes_whitespace_inside_answers():
+    grader = compile_grader("fill_blank", {"fills": {"a": "ibu kota"}})
+    assert grader({"fills": {"a": "Ibu \t  Kota"}}) is True
+
+def test_fill_blank_compares_non_string_values_as_text():
+    grader = compile_grader("fill_blank", {"fills": {"a": 12}})
+    assert grader({"fills": {"a": "12"}}) is True
+    assert grader({"fills": {"a": 12}}) is True
+
+@pytest.mark.parametrize("expected, answer, correct", [
+    (True, {"answer": True}, True),
+    (True, {"answer": False}, False),
+    (True, {"answer": "true"}, True),
+    (True, {"answer": " TRUE "}, True),
+    (True, {"answer": "false"}, False),
+    (False, {"answer": "False"}, True),
+    (False, {"answer": False}, True),
+    ("true", {"answer": True}, True),
+    ("false", {"answer": "false"}, True),
+    # Other strings are not booleans
+    (True, {"answer": "yes"}, False),
+    (True, {"answer": "benar"}, False),
+    (True, {"answer": None}, False),
+    (True, {}, False),
+])
+def test_true_false(expected, answer, correct):
+    assert compile_grader("true_false", {"answer": expected})(answer) is correct
+
+def test_unknown_question_type_rejects_everything():
+    grader = compile_grader("essay", {"text": "apa saja"})
+    assert type(grader) is Grader
+    assert grader({"text": "apa saja"}) is False
+
+def test_missing_correct_answer_does_not_raise():
+    for question_type in GRADERS:
+        assert compile_grader(question_type, None)({}) in (True, False)
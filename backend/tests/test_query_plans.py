@@ -0,0 +1,83 @@
+"""
+Guards against hot queries regressing to full table scans.
+
+Each test captures the SELECT statements a request issues and runs
+``EXPLAIN QUERY PLAN`` on them with the same parameters. None of them may
+``SCAN`` one of the tables that grow with usage.
+"""
+import re
+from contextlib import contextmanager
+from typing import List, Tuple
+import pytest
+from sqlalchemy import event
+from app.achievements import REQUIREMENT_METRICS, check_achievements
+from app.database import SessionLocal, engine
+from app.models import UserLevel
+
+LARGE_TABLES = {"quiz_submissions", "questions", "user_achievements"}
+SCAN = re.compile(r"\bSCAN (\w+)")
+
+@contextmanager
+def captured_selects():
+    statements: List[Tuple[str, tuple]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+def table_scans(statements: List[Tuple[str, tuple]]) -> List[str]:
+    scans = []
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters):
+                match = SCAN.search(row[-1])
+                if match and match.group(1) in LARGE_TABLES:
+                    scans.append(f"{row[-1]}\n    in: {' '.join(statement.split())}")
+    return scans
+
+def assert_no_scans(statements: List[Tuple[str, tuple]], table: str):
+    assert any(table in statement for statement, _ in statements), f"no query touched {table}"
+    scans = table_scans(statements)
+    assert not scans, "full table scans:\n" + "\n".join(scans)
+
+@pytest.mark.parametrize("path, table", [
+    ("/api/students/progress", "student_subject_stats"),
+    ("/api/students/achievements", "user_achievements"),
+    ("/api/quizzes/submissions", "quiz_submissions"),
+    ("/api/quizzes/submissions?limit=2&after=1", "quiz_submissions"),
+    ("/api/quizzes/submissions?subject_id={subject_id}&since=2000-01-01T00:00:00", "quiz_submissions"),
+    ("/api/quizzes/submissions/{question_id}", "quiz_submissions"),
+])
+def test_student_queries_use_indexes(client, seed, path, table):
+    url = path.format(subject_id=seed["subject_id"], question_id=seed["question_ids"][0])
+    with captured_selects() as statements:
+        response = client.get(url, headers=seed["student"])
+    assert response.status_code == 200, response.text
+    assert_no_scans(statements, table)
+
+@pytest.mark.parametrize("path", [
+    "/api/admin/scores",
+    "/api/admin/scores?sort_by=points&limit=1",
+    "/api/admin/scores?sort_by=accuracy&limit=1&after=50.0,1",
+])
+def test_score_queries_use_indexes(client, seed, path):
+    with captured_selects() as statements:
+        response = client.get(path, headers=seed["admin"])
+    assert response.status_code == 200, response.text
+    assert_no_scans(statements, "student_subject_stats")
+
+def test_achievement_lookup_uses_index(seed):
+    with SessionLocal() as db:
+        user_level = db.query(UserLevel).filter(UserLevel.user_id == seed["student_id"]).one()
+        # Pretend every metric started from zero so all thresholds are candidates
+        previous = {requirement_type: 0 for requirement_type in REQUIREMENT_METRICS}
+        with captured_selects() as statements:
+            check_achievements(db, seed["student_id"], user_level, previous)
+        db.rollback()
+    assert_no_scans(statements, "user_achievements")
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import Layout from '../components/Layout'
 import { api } from '../services/api'
 import { motion } from 'framer-motion'
@@ -9,11 +9,41 @@ export default function ScoresView() {
   const [loading, setLoading] = useState(true)
   const [selectedStudent, setSelectedStudent] = useState(null)
   const [feedbackMessage, setFeedbackMessage] = useState('')
+  const studentIds = useRef(new Set())
 
   useEffect(() => {
     loadData()
   }, [])
 
+  // Apply live score deltas instead of re-fetching all scores
+  useEffect(() => {
+    const socket = api.openLiveScores()
+    socket.onmessage = (event) => {
+      const message = JSON.parse(event.data)
+      if (message.type === 'resync' || message.deltas.some((delta) => !studentIds.current.has(delta.student_id))) {
+        loadData()
+        return
+      }
+      const deltas = new Map(message.deltas.map((delta) => [delta.student_id, delta]))
+      setScores((current) =>
+        current.map((score) => {
+          const delta = deltas.get(score.student_id)
+          if (!delta) return score
+          const totalQuestions = score.total_questions + delta.attempts
+          const correctAnswers = score.correct_answers + delta.correct
+          return {
+            ...score,
+            total_questions: totalQuestions,
+            correct_answers: correctAnswers,
+            total_points: score.total_points + delta.points,
+            accuracy: totalQuestions > 0 ? (correctAnswers * 100) / totalQuestions : 0,
+          }
+        })
+      )
+    }
+    return () => socket.close()
+  }, [])
+
   const loadData = async () => {
     try {
       const [scoresRes, studentsRes] = await Promise.all([
@@ -21,6 +51,7 @@ export default function ScoresView() {
         api.getStudents(),
       ])
       setScores(scoresRes.data)
+      studentIds.current = new Set(scoresRes.data.map((score) => score.student_id))
       setStudents(studentsRes.data)
     } catch (error) {
       console.error('Error loading data:', error)
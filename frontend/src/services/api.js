@@ -31,9 +31,24 @@ export const api = {
 
   deleteQuestion: (id) => axios.delete(`${API_BASE_URL}/questions/${id}`),
 
+  importQuestions: (file, format) => {
+    const formData = new FormData()
+    formData.append('file', file)
+    return axios.post(`${API_BASE_URL}/questions/import`, formData, { params: { format } })
+  },
+
+  exportQuestions: (params) => axios.get(`${API_BASE_URL}/questions/export`, { params, responseType: 'blob' }),
+
   // Quiz
   submitAnswer: (data) => axios.post(`${API_BASE_URL}/quizzes/submit`, data),
 
+  submitAnswersBatch: (answers, sessionId) => axios.post(`${API_BASE_URL}/quizzes/submit/batch`, { answers, session_id: sessionId }),
+
+  startQuizSession: (subjectId, numQuestions = 10, mode = 'random') =>
+    axios.post(`${API_BASE_URL}/quizzes/sessions`, { subject_id: subjectId, num_questions: numQuestions, mode }),
+
+  getQuizSession: (sessionId) => axios.get(`${API_BASE_URL}/quizzes/sessions/${sessionId}`),
+
   getSubmissions: () => axios.get(`${API_BASE_URL}/quizzes/submissions`),
 
   // Progress
@@ -42,7 +57,7 @@ export const api = {
   // Admin
   getStudents: () => axios.get(`${API_BASE_URL}/admin/students`),
 
-  getScores: () => axios.get(`${API_BASE_URL}/admin/scores`),
+  getScores: (params) => axios.get(`${API_BASE_URL}/admin/scores`, { params }),
 
   // Admin Subjects
   getAdminSubjects: () => axios.get(`${API_BASE_URL}/admin/subjects`),
@@ -55,10 +70,27 @@ export const api = {
 
   deleteSubject: (id) => axios.delete(`${API_BASE_URL}/admin/subjects/${id}`),
 
+  exportGradebook: (name, params) => axios.get(`${API_BASE_URL}/admin/export/${name}`, { params, responseType: 'blob' }),
+
+  // Live score deltas; the token goes in the URL because browsers cannot set WebSocket headers
+  openLiveScores: () => {
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws'
+    const token = encodeURIComponent(localStorage.getItem('token') || '')
+    return new WebSocket(`${protocol}://${window.location.host}${API_BASE_URL}/admin/live/scores?token=${token}`)
+  },
+
+  getQuestionStats: (id) => axios.get(`${API_BASE_URL}/admin/questions/${id}/stats`),
+
+  getSubjectQuestionStats: (subjectId) => axios.get(`${API_BASE_URL}/admin/subjects/${subjectId}/question-stats`),
+
   createFeedback: (data) => axios.post(`${API_BASE_URL}/admin/feedback`, data),
 
   getFeedback: () => axios.get(`${API_BASE_URL}/students/feedback`),
 
+  getLeaderboard: (params) => axios.get(`${API_BASE_URL}/students/leaderboard`, { params }),
+
+  getReviewQueue: (limit = 10) => axios.get(`${API_BASE_URL}/students/review`, { params: { limit } }),
+
   // Level and Achievements
   getMyLevel: () => axios.get(`${API_BASE_URL}/students/level`),
   getMyAchievements: () => axios.get(`${API_BASE_URL}/students/achievements`),